@@ -0,0 +1,147 @@
+import functools
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+
+import loaders
+
+# Projection scales the maps are drawn at, a simplified variant of the map is prepared for each
+ZOOM_SCALES = (550, 1100, 2200, 4400)
+
+# Latitude at which the size of a pixel is measured (the centre of the maps)
+REFERENCE_LATITUDE = 49
+
+# Vertices closer than this many pixels to the simplified outline are dropped
+PIXEL_TOLERANCE = 0.5
+
+# Decimals kept for the coordinates (~10 m)
+COORDINATE_DECIMALS = 4
+
+# Feature properties kept in the charts, the translations of the names are dropped
+PROPERTIES = ['name:en', 'iso3166-2']
+
+# Region assign_oblast gives the points of the city of Kyiv, which lies within Kyiv Oblast
+KYIV = 'Kyiv'
+
+# Points outside every region but closer than this (degrees, ~5 km) to one get the nearest region:
+# the polygons are coarse, border villages and the coast fall just outside them
+OBLAST_MAX_DISTANCE_DEG = 0.05
+
+
+def tolerance_deg(scale):
+    '''
+      Simplification tolerance (degrees) of a map drawn with a Mercator projection of the given scale:
+      PIXEL_TOLERANCE pixels at REFERENCE_LATITUDE, measured along the meridian where pixels are smallest
+      tolerance_deg(1100) --> 0.01707...
+    '''
+    return PIXEL_TOLERANCE * np.degrees(np.cos(np.radians(REFERENCE_LATITUDE)) / scale)
+
+
+def simplify(geometries, tolerance):
+    '''
+      Simplify the oblast polygons together so neighbouring oblasts keep a common border.
+      shapely.coverage_simplify needs Shapely 2.1, older versions simplify every polygon on its own
+      simplify(basemap.geometries, tolerance_deg(1100)) --> array([<POLYGON ((...))>, ...])
+    '''
+    if hasattr(shapely, 'coverage_simplify'):
+        return shapely.coverage_simplify(geometries, tolerance)
+    return shapely.simplify(geometries, tolerance, preserve_topology=True)
+
+
+def _round_coordinates(geometries):
+    # Shared vertices are rounded the same way, so the borders stay shared
+    return shapely.transform(geometries, lambda coords: np.round(coords, COORDINATE_DECIMALS))
+
+
+class Basemap:
+    '''
+      The map of Ukraine and its oblasts, read once.
+      Charts get a FeatureCollection simplified for the scale they are drawn at (see for_scale),
+      the variants are computed on first use and kept in memory.
+      Basemap('./Data/ukraine_geojson-master').for_scale(1100) --> {'type': 'FeatureCollection', 'features': [...]}
+    '''
+
+    def __init__(self, map_dir):
+        map_dir = Path(map_dir)
+
+        # Full map: one feature per oblast
+        features = loaders.read_geojson(map_dir.joinpath('UA_FULL_Ukraine.geojson'))['features']
+        self.geometries = np.array([shapely.geometry.shape(feature['geometry']) for feature in features])
+        self.properties = [{key: feature['properties'].get(key) for key in PROPERTIES} for feature in features]
+
+        # Oblast files, e.g. UA_32_Kyivska.geojson, and the city of Kyiv
+        oblast_files = sorted(map_dir.glob('UA_[0-9][0-9]_*.geojson'))
+        self.oblast_names = [path.stem.split('_', 2)[2] for path in oblast_files]
+        self.oblast_codes = ['UA-' + path.stem.split('_', 2)[1] for path in oblast_files]
+        self.oblast_geometries = np.array([shapely.geometry.shape(loaders.read_geojson(path)['geometry'])
+                                           for path in oblast_files])
+        self.kyiv = shapely.geometry.shape(loaders.read_geojson(map_dir.joinpath('kyiv.geojson'))['geometry'])
+
+    @functools.cached_property
+    def regions(self):
+        '''
+          Names and geometries of the regions assign_oblast assigns points to: the city of Kyiv, then the oblasts
+          (English names of the full map). The geometries are made valid and prepared once
+          basemap.regions --> (['Kyiv', 'Vinnytsia Oblast', ...], array([<POLYGON ((...))>, ...]))
+        '''
+        english = {properties['iso3166-2']: properties['name:en'] for properties in self.properties}
+        names = [KYIV] + [english.get(code, name) for code, name in zip(self.oblast_codes, self.oblast_names)]
+        geometries = shapely.make_valid(np.concatenate([[self.kyiv], self.oblast_geometries]))
+        shapely.prepare(geometries)
+        return names, geometries
+
+    @functools.cached_property
+    def _region_tree(self):
+        # Spatial index of the regions for the points outside all of them
+        return shapely.STRtree(self.regions[1])
+
+    def assign_oblast(self, latitude, longitude):
+        '''
+          Region (oblast or the city of Kyiv) of every point, NaN outside of Ukraine. A point on a border
+          gets the first region of regions, a point outside every region gets the nearest one within
+          OBLAST_MAX_DISTANCE_DEG
+          basemap.assign_oblast(df_battle['latitude'], df_battle['longitude']) --> Categorical (['Donetsk Oblast', ...])
+        '''
+        names, geometries = self.regions
+        x = np.asarray(longitude, dtype=np.float64)
+        y = np.asarray(latitude, dtype=np.float64)
+        codes = np.full(len(x), -1, dtype=np.int8)
+
+        # Only the unassigned points within the bounding box of a region are tested against it
+        for code, (geometry, (xmin, ymin, xmax, ymax)) in enumerate(zip(geometries, shapely.bounds(geometries))):
+            candidates = np.flatnonzero((codes == -1) & (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax))
+            codes[candidates[shapely.contains_xy(geometry, x[candidates], y[candidates])]] = code
+
+        # Points just outside the regions get the nearest one
+        outside = np.flatnonzero((codes == -1) & np.isfinite(x) & np.isfinite(y))
+        if len(outside):
+            found, nearest = self._region_tree.query_nearest(shapely.points(x[outside], y[outside]),
+                                                             max_distance=OBLAST_MAX_DISTANCE_DEG, all_matches=False)
+            codes[outside[found]] = nearest
+        return pd.Categorical.from_codes(codes, categories=names)
+
+    def _feature_collection(self, geometries):
+        return {
+            'type': 'FeatureCollection',
+            'features': [{'type': 'Feature', 'geometry': shapely.geometry.mapping(geometry), 'properties': properties}
+                         for geometry, properties in zip(geometries, self.properties)],
+        }
+
+    @functools.lru_cache()
+    def variant(self, scale=None):
+        '''
+          FeatureCollection simplified for a scale of ZOOM_SCALES, or at full resolution for scale=None
+        '''
+        geometries = self.geometries if scale is None else simplify(self.geometries, tolerance_deg(scale))
+        return self._feature_collection(_round_coordinates(geometries))
+
+    def for_scale(self, scale):
+        '''
+          The lightest variant that is still accurate to PIXEL_TOLERANCE at the given scale:
+          the variant of the smallest zoom scale at least as large, full resolution beyond the largest
+          basemap.for_scale(1100) --> {'type': 'FeatureCollection', 'features': [...]}
+        '''
+        fitting = [zoom for zoom in ZOOM_SCALES if zoom >= scale]
+        return self.variant(min(fitting) if fitting else None)
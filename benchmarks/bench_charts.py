@@ -0,0 +1,105 @@
+'''
+  Measure the size of the Vega-Lite specs of the event maps and how long they take to serialize,
+  building the charts the way the app did before charts.py (full resolution base map inlined in
+  every layer, whole dataframes) and with the charts.py helpers (shared base map simplified by
+  basemap.py, encoded columns, binning).
+
+  python benchmarks/bench_charts.py --events 20000 --html /tmp/charts
+
+  Browser render time cannot be measured from Python: with --html the before/after pages are
+  written so they can be opened and profiled in a browser.
+'''
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import altair as alt
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import basemap
+import charts
+import loaders
+
+MAP_DIR = Path(__file__).resolve().parent.parent.joinpath('Data', 'ukraine_geojson-master')
+
+PROJECTION = dict(type='mercator', scale=1100, center=[31, 49])
+
+
+def random_events(n, rng):
+    # Events over Ukraine with the columns the app loads, plus the free text notes of the export
+    event_types = ['Battles', 'Explosions/Remote violence', 'Violence against civilians']
+    return pd.DataFrame({
+        'data_id': np.arange(n, dtype=np.int32),
+        'event_date': pd.Timestamp('2022-02-24') + pd.to_timedelta(rng.integers(0, 365, n), unit='D'),
+        'year': np.int16(2022),
+        'event_type': pd.Categorical(rng.choice(event_types, n)),
+        'sub_event_type': pd.Categorical(rng.choice(['Armed clash', 'Shelling/artillery/missile attack'], n)),
+        'admin1': pd.Categorical(rng.choice(['Donetsk', 'Kharkiv', 'Kyiv', 'Luhansk'], n)),
+        'location': pd.Categorical(rng.choice(['Town {}'.format(i) for i in range(500)], n)),
+        'latitude': rng.uniform(44.5, 52.0, n).astype(np.float32),
+        'longitude': rng.uniform(23.0, 40.0, n).astype(np.float32),
+        'fatalities': rng.integers(0, 5, n, dtype=np.int32),
+        'notes': pd.Series(['On {}, forces shelled the area of a town in the region. '
+                            '[size=no report]'.format(i) for i in range(n)], dtype=object),
+    })
+
+
+def before(events):
+    # Base map inlined in every chart, every column of the events in the spec
+    ukraine_map = loaders.read_geojson(MAP_DIR.joinpath('UA_FULL_Ukraine.geojson'))
+
+    def base(title):
+        return alt.Chart(alt.Data(values=ukraine_map)).mark_geoshape(
+            stroke='black', strokeWidth=0.5).encode(color=alt.value('#f5f5f5')).project(**PROJECTION).properties(title=title)
+
+    points = alt.Chart(events).mark_circle().encode(
+        latitude='latitude:Q', longitude='longitude:Q', tooltip=['location:N', 'event_type:O'],
+        color='event_type:O').project(**PROJECTION)
+    line = alt.Chart(events).mark_line().encode(
+        order='latitude:O', latitude='latitude:Q', longitude='longitude:Q').project(**PROJECTION)
+    return alt.vconcat(alt.layer(base('Events'), points), alt.layer(base('Lines'), points, line))
+
+
+def after(events):
+    ukraine_map = basemap.Basemap(MAP_DIR).for_scale(PROJECTION['scale'])
+
+    def base(title):
+        return alt.Chart(charts.geo_data(ukraine_map)).mark_geoshape(
+            stroke='black', strokeWidth=0.5).encode(color=alt.value('#f5f5f5')).project(**PROJECTION).properties(title=title)
+
+    points = charts.event_chart(events, by=['event_type'], tooltip=['location:N', 'event_type:O']).mark_circle().encode(
+        color='event_type:O').project(**PROJECTION)
+    line_points = charts.encoded(events, 'latitude', 'longitude')
+    line = alt.Chart(line_points).mark_line().encode(
+        order='latitude:O', latitude='latitude:Q', longitude='longitude:Q').project(**PROJECTION)
+    return alt.vconcat(alt.layer(base('Events'), points), alt.layer(base('Lines'), points, line))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=20000, help='number of events on the maps')
+    parser.add_argument('--html', type=Path, help='directory to write the before/after pages to')
+    args = parser.parse_args()
+
+    alt.data_transformers.disable_max_rows()
+    events = random_events(args.events, np.random.default_rng(0))
+
+    for name, build in [('before', before), ('after', after)]:
+        start = time.perf_counter()
+        chart = build(events)
+        spec = json.dumps(chart.to_dict())
+        elapsed = time.perf_counter() - start
+        print('{:6s}: {:8.2f} MB spec, {:6.2f} s to build and serialize'.format(name, len(spec) / 1e6, elapsed))
+
+        if args.html is not None:
+            args.html.mkdir(parents=True, exist_ok=True)
+            chart.save(str(args.html.joinpath(name + '.html')))
+
+
+if __name__ == '__main__':
+    main()
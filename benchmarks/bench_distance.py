@@ -0,0 +1,60 @@
+'''
+  Benchmark the batched distance kernels in geodistance.py against per-pair geopy calls.
+
+  python benchmarks/bench_distance.py --size 10000
+
+  geopy is far too slow to run on the full size x size matrix, so it is timed on a sample
+  of pairs and extrapolated.
+'''
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import geopy.distance
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import geodistance
+
+
+def random_points(n, rng):
+    # Points spread over the bounding box of Ukraine
+    return rng.uniform(44.0, 52.5, n), rng.uniform(22.0, 40.5, n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=10000, help='number of points on each side')
+    parser.add_argument('--radius', type=float, default=100, help='threshold radius in km')
+    parser.add_argument('--geopy-sample', type=int, default=20000, help='pairs timed with geopy')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    lat1, lon1 = random_points(args.size, rng)
+    lat2, lon2 = random_points(args.size, rng)
+    pairs = args.size * args.size
+
+    # Per-pair geopy, extrapolated to the full matrix
+    sample = rng.integers(0, args.size, (args.geopy_sample, 2))
+    start = time.perf_counter()
+    expected = np.array([geopy.distance.geodesic((lat1[i], lon1[i]), (lat2[j], lon2[j])).km for i, j in sample])
+    geopy_time = (time.perf_counter() - start) * pairs / args.geopy_sample
+    print('geopy geodesic    : {:10.2f} s (extrapolated from {} pairs)'.format(geopy_time, args.geopy_sample))
+
+    for method in geodistance.METHODS:
+        start = time.perf_counter()
+        geodistance.any_within(lat1, lon1, lat2, lon2, args.radius, method=method)
+        elapsed = time.perf_counter() - start
+
+        # Accuracy against geopy on the sampled pairs
+        pairwise = geodistance.haversine_km if method == 'haversine' else geodistance.geodesic_km
+        sampled = pairwise(lat1[sample[:, 0]], lon1[sample[:, 0]], lat2[sample[:, 1]], lon2[sample[:, 1]])
+        error = np.abs(sampled - expected)
+        print('{:18s}: {:10.2f} s ({:6.0f}x faster), max error {:.2e} km / {:.3%}'.format(
+            method, elapsed, geopy_time / elapsed, error.max(), (error / expected).max()))
+
+
+if __name__ == '__main__':
+    main()
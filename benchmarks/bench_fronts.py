@@ -0,0 +1,112 @@
+'''
+  Benchmark the front polygon / area difference pipeline in fronts.py against the
+  previous per-object Shapely loop, and time the equal-area (km²) variant the app uses,
+  serially and on a thread pool, and the battle lines in dataframe order against the
+  lines ordered along the front (with the share of lines that do not cross themselves).
+
+  python benchmarks/bench_fronts.py --days 1000
+  python benchmarks/bench_fronts.py --days 3650 --workers 4 --skip-loop
+'''
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fronts
+
+
+def random_battles(days, per_day, rng):
+    # Battles spread over the eastern front, newest day first like the ACLED export
+    counts = rng.integers(2, 2 * per_day, days)
+    dates = np.repeat(pd.date_range('2022-02-24', periods=days)[::-1], counts)
+    return pd.DataFrame({'event_date': dates,
+                         'latitude': rng.uniform(46.5, 50.2, counts.sum()),
+                         'longitude': rng.uniform(35.1, 39.5, counts.sum())})
+
+
+def per_object_loop(battles_df):
+    # The pipeline as it was written before fronts.py: one Shapely object at a time
+    anchors = [shapely.geometry.Point(x, y) for x, y in fronts.EAST_ANCHORS]
+    dates = battles_df['event_date'].unique()
+    lines = []
+    for battle_date in dates:
+        date_df = battles_df[battles_df['event_date'].isin([battle_date])]
+        lines.append(shapely.geometry.LineString(list(zip(date_df.longitude, date_df.latitude))))
+
+    polygons = []
+    for line in lines:
+        polygon_points = [list(line.coords)[i] for i in range(0, len(line.coords))]
+        polygon_points += [list(anchor.coords)[0] for anchor in anchors]
+        polygons.append(shapely.geometry.polygon.Polygon(polygon_points))
+
+    differences = [0]
+    for x in range(1, len(polygons)):
+        diff_1 = polygons[x].buffer(.01) - polygons[x - 1].buffer(.01)
+        diff_2 = polygons[x - 1].buffer(.01) - polygons[x].buffer(.01)
+        differences.append(diff_1.area + diff_2.area)
+    return np.array(differences)
+
+
+def vectorized(battles_df):
+    # Same computation in squared degrees with the old .01 degree buffer, for comparison
+    daily = fronts.DailyFronts(battles_df)
+    return fronts.area_differences(fronts.create_east_polygon(daily.lines()), buffer=.01)
+
+
+def equal_area(battles_df, workers=None):
+    # What the app runs: reprojection to the equal-area CRS and a metric buffer, in km²
+    daily = fronts.DailyFronts(battles_df)
+    polygons = fronts.create_east_polygon(daily.lines(), equal_area=True, workers=workers)
+    return fronts.area_differences(polygons, workers=workers) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--days', type=int, default=1000, help='number of days of battles')
+    parser.add_argument('--per-day', type=int, default=10, help='average number of battles per day')
+    parser.add_argument('--workers', type=int, default=4, help='threads of the parallel equal-area run')
+    parser.add_argument('--skip-loop', action='store_true', help='do not run the (slow) per-object loop')
+    args = parser.parse_args()
+
+    battles_df = random_battles(args.days, args.per_day, np.random.default_rng(0))
+
+    if not args.skip_loop:
+        timings = {}
+        results = {}
+        for name, pipeline in [('per-object loop', per_object_loop), ('vectorized', vectorized)]:
+            start = time.perf_counter()
+            results[name] = pipeline(battles_df)
+            timings[name] = time.perf_counter() - start
+            print('{:16s}: {:8.3f} s'.format(name, timings[name]))
+
+        print('speedup         : {:8.1f}x'.format(timings['per-object loop'] / timings['vectorized']))
+        print('max abs diff    : {:.2e}'.format(np.abs(results['per-object loop'] - results['vectorized']).max()))
+
+    start = time.perf_counter()
+    serial = equal_area(battles_df)
+    serial_time = time.perf_counter() - start
+    print('equal-area (km²): {:8.3f} s'.format(serial_time))
+
+    start = time.perf_counter()
+    threaded = equal_area(battles_df, workers=args.workers)
+    threaded_time = time.perf_counter() - start
+    print('{:2d} threads      : {:8.3f} s ({:.1f}x), identical: {}'.format(
+        args.workers, threaded_time, serial_time / threaded_time, np.array_equal(serial, threaded)))
+
+    daily = fronts.DailyFronts(battles_df)
+    for name, build in [('dataframe order', daily.lines),
+                        ('along the front', lambda: daily.ordered_lines(end=fronts.EAST_ANCHORS[0]))]:
+        start = time.perf_counter()
+        lines = build()
+        print('{:16s}: {:8.3f} s, simple lines: {:.1%}'.format(name, time.perf_counter() - start,
+                                                                shapely.is_simple(lines).mean()))
+
+
+if __name__ == '__main__':
+    main()
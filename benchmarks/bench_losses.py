@@ -0,0 +1,84 @@
+'''
+  Benchmark the day-wise losses of losses.py against the previous one column at a time loop
+  on long daily histories.
+
+  python benchmarks/bench_losses.py --days 20000
+
+  The history is generated from the day-wise equipment losses of the bundled Kaggle dataset,
+  resampled with a fixed seed and summed up again.
+'''
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import loaders
+import losses
+
+
+def random_history(days, rng):
+    # Cumulative equipment losses over days days, every category reported every day
+    df = loaders.read_equipment_losses(ROOT.joinpath('Data', 'russia_losses_equipment.csv'))
+    by_day = losses.daywise(df).iloc[1:]
+    history = by_day.iloc[rng.integers(0, len(by_day), days)].reset_index(drop=True)
+    columns = losses.loss_columns(history)
+    history[columns] = history[columns].astype(np.float64).fillna(0).cumsum()
+    history['date'] = pd.date_range('2022-02-25', periods=days)
+    history['day'] = np.arange(days) + 2
+    return history
+
+
+def column_loop(df):
+    # The conversion as the app did it: one column at a time, then the first row patched back
+    df_by_day = pd.DataFrame()
+    date, day, *loss_cols = df.columns
+    df_by_day[date] = df[date]
+    df_by_day[day] = df[day]
+    for col_name in loss_cols:
+        if df[col_name].dtype.kind in 'biufc':
+            df_by_day[col_name] = df[col_name] - df[col_name].shift()
+        else:
+            df_by_day[col_name] = df[col_name]
+    df_by_day.iloc[0] = df.iloc[0]
+    return df_by_day
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=20000, help='length of the daily history')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of every method, the best is reported')
+    args = parser.parse_args()
+
+    history = random_history(args.days, np.random.default_rng(0))
+    columns = losses.loss_columns(history)
+
+    timings = {}
+    results = {}
+    # The resampled losses go down on some days, they are kept as they are for the comparison
+    daywise = lambda df: losses.daywise(df, monotonic=False)
+    for name, method in [('column loop', column_loop), ('daywise', daywise)]:
+        best = np.inf
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results[name] = method(history)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+        print('{:12s}: {:8.4f} s'.format(name, best))
+
+    print('speedup     : {:8.1f}x'.format(timings['column loop'] / timings['daywise']))
+    print('identical   : {}'.format(np.allclose(results['column loop'][columns].to_numpy(np.float64),
+                                                results['daywise'][columns].to_numpy(np.float64), equal_nan=True)))
+
+    start = time.perf_counter()
+    losses.tidy(results['daywise'])
+    print('tidy view   : {:8.4f} s'.format(time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+'''
+  Track the peak memory of loading the ACLED data the way the app does.
+
+  python benchmarks/bench_memory.py --rows 500000
+  python benchmarks/bench_memory.py --rows 2000000 --foreign-share 0.95
+
+  A synthetic ACLED export is generated from the rows of Data/civ_explosions.csv
+  (the only ACLED-shaped file bundled with the repo). With --foreign-share that share of
+  the rows is moved to other countries, like in a global export. Each mode runs in its own
+  process and reports its peak resident set size.
+'''
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import loaders
+import pipeline
+
+EVENT_TYPES = ['Battles', 'Explosions/Remote violence', 'Violence against civilians',
+               'Protests', 'Strategic developments']
+
+
+FOREIGN_COUNTRIES = ['Russia', 'Syria', 'Yemen', 'Mexico', 'Nigeria']
+
+
+def write_synthetic_export(path, rows, foreign_share, rng):
+    sample = pd.read_csv(ROOT.joinpath('Data', 'civ_explosions.csv'), index_col=0)
+    df = sample.iloc[rng.integers(0, len(sample), rows)].reset_index(drop=True)
+    df['data_id'] = np.arange(rows) + 9000000
+    df['event_type'] = rng.choice(EVENT_TYPES, rows, p=[.35, .45, .1, .05, .05])
+    df['latitude'] = (df['latitude'] + rng.normal(0, .05, rows)).round(4)
+    df['longitude'] = (df['longitude'] + rng.normal(0, .05, rows)).round(4)
+    foreign = rng.random(rows) < foreign_share
+    df.loc[foreign, 'country'] = rng.choice(FOREIGN_COUNTRIES, foreign.sum())
+    df.to_csv(path, index=False)
+
+
+def load_default(path):
+    # Default dtypes, every column, a full copy per subset
+    df_battle = pd.read_csv(path, sep=',')
+    df_battle['event_date'] = pd.to_datetime(df_battle['event_date'])
+    subsets = [df_battle[df_battle['event_type'] == 'Battles'].copy(),
+               df_battle[df_battle['event_type'] == 'Explosions/Remote violence'].copy(),
+               df_battle[df_battle['event_type'] != 'Strategic developments'].copy()]
+    return df_battle, subsets
+
+
+def load_schema(path):
+    # Declared schema, projected columns, subsets as slices of the sorted frame
+    df_battle = loaders.sort_by_event_type(loaders.read_battles(path, columns=loaders.ANALYSIS_COLUMNS))
+    subsets = [df_battle.iloc[loaders.event_type_rows(df_battle, 'Battles')],
+               df_battle.iloc[loaders.event_type_rows(df_battle, 'Explosions/Remote violence')],
+               df_battle.iloc[loaders.event_type_rows(df_battle, 'Strategic developments', exclude=True)]]
+    return df_battle, subsets
+
+
+def load_streaming(path):
+    # Rows of other countries filtered chunk by chunk, as pipeline.load_battles does
+    df_battle = loaders.sort_by_event_type(loaders.read_acled(path, columns=loaders.ANALYSIS_COLUMNS,
+                                                              countries=pipeline.COUNTRIES))
+    subsets = [df_battle.iloc[loaders.event_type_rows(df_battle, 'Battles')],
+               df_battle.iloc[loaders.event_type_rows(df_battle, 'Explosions/Remote violence')],
+               df_battle.iloc[loaders.event_type_rows(df_battle, 'Strategic developments', exclude=True)]]
+    return df_battle, subsets
+
+
+def load_nothing(path):
+    # Imports only, the floor the other modes are compared against
+    return pd.DataFrame(), []
+
+
+MODES = {'imports only': load_nothing, 'default': load_default, 'schema': load_schema, 'streaming': load_streaming}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500000, help='rows of the synthetic ACLED export')
+    parser.add_argument('--foreign-share', type=float, default=0, help='share of the rows in other countries')
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--path', type=Path, help=argparse.SUPPRESS)
+    parser.add_argument('--write', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.write:
+        # Child process: the peak RSS is kept across fork and exec, so the export is not generated
+        # in the process starting the measured ones
+        write_synthetic_export(args.path, args.rows, args.foreign_share, np.random.default_rng(0))
+        return
+
+    if args.mode:
+        # Child process: load the data and report the peak RSS in MB (ru_maxrss is in KB on Linux)
+        df_battle, _ = MODES[args.mode](args.path)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print('{:.1f} {:.1f}'.format(peak / 1024, df_battle.memory_usage(deep=True).sum() / 2 ** 20))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp).joinpath('acled_synthetic.csv')
+        subprocess.run([sys.executable, __file__, '--write', '--path', str(path), '--rows', str(args.rows),
+                        '--foreign-share', str(args.foreign_share)], check=True)
+        print('synthetic export: {} rows, {:.1f} MB on disk'.format(args.rows, path.stat().st_size / 2 ** 20))
+
+        for mode in MODES:
+            output = subprocess.run([sys.executable, __file__, '--mode', mode, '--path', str(path)],
+                                    check=True, capture_output=True, text=True).stdout
+            peak, frame = map(float, output.split())
+            print('{:12s}: peak RSS {:8.1f} MB, df_battle {:8.1f} MB'.format(mode, peak, frame))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+'''
+  Time every computational stage of the app on synthetic data of several sizes:
+  loading the ACLED export, the derived columns, the oblast of every event, the event cube
+  and its date-range queries, the civilian explosions classifier, the front segmentation, the battle lines / front
+  polygons / area differences, the day-wise losses and the Vega-Lite specs of the event maps.
+
+  python benchmarks/bench_suite.py --sizes 10000 50000 200000 --output /tmp/bench/HEAD.json
+  python benchmarks/bench_suite.py --compare /tmp/bench/HEAD~1.json
+
+  The synthetic data is resampled from the bundled CSV files (the ACLED rows of
+  Data/civ_explosions.csv, the day-wise losses of the Kaggle datasets) with a fixed seed,
+  so runs are comparable across commits without the ACLED export. With --output the
+  timings are written as JSON along with the commit they were measured at, --compare
+  reports the ratio to a previous run and exits with status 1 if a stage got slower
+  than --threshold.
+'''
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import altair as alt
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import basemap
+import charts
+import cube
+import explosions
+import fronts
+import loaders
+import losses
+import segments
+
+DATA_DIR = ROOT.joinpath('Data')
+MAP_DIR = DATA_DIR.joinpath('ukraine_geojson-master')
+
+EVENT_TYPES = ['Battles', 'Explosions/Remote violence', 'Violence against civilians',
+               'Protests', 'Strategic developments']
+
+# Battle data rows per day of the synthetic losses datasets
+ROWS_PER_LOSS_DAY = 50
+
+
+def synthetic_acled(rows, rng):
+    # Rows of the bundled ACLED subset, with event types in the proportions of the full export
+    # and coordinates jittered so the events do not sit on top of each other
+    sample = pd.read_csv(DATA_DIR.joinpath('civ_explosions.csv'), index_col=0)
+    df = sample.iloc[rng.integers(0, len(sample), rows)].reset_index(drop=True)
+    df['data_id'] = np.arange(rows) + 9000000
+    df['event_type'] = rng.choice(EVENT_TYPES, rows, p=[.35, .45, .1, .05, .05])
+    df['latitude'] = (df['latitude'] + rng.normal(0, .05, rows)).round(4)
+    df['longitude'] = (df['longitude'] + rng.normal(0, .05, rows)).round(4)
+    return df
+
+
+def synthetic_losses(df, days, rng):
+    # Cumulative losses whose day-wise increments are resampled from a bundled losses dataset
+    by_day = losses.daywise(df).iloc[1:]
+    increments = by_day.iloc[rng.integers(0, len(by_day), days)].reset_index(drop=True)
+    numeric = increments.columns[2:][[increments[name].dtype.kind in 'biufc' for name in increments.columns[2:]]]
+    increments[numeric] = increments[numeric].cumsum()
+    increments[increments.columns[0]] = pd.date_range('2022-02-25', periods=days)
+    increments[increments.columns[1]] = np.arange(days, dtype=np.int16) + 2
+    return increments
+
+
+def prepare(rows, tmp, rng):
+    # Inputs of every stage for one size, the files are written to tmp
+    csv_path = Path(tmp).joinpath('acled_synthetic.csv')
+    synthetic_acled(rows, rng).to_csv(csv_path, index=False)
+
+    df_battle = loaders.sort_by_event_type(loaders.read_acled(csv_path, columns=loaders.ANALYSIS_COLUMNS))
+    df_battles_only = df_battle.iloc[loaders.event_type_rows(df_battle, 'Battles')]
+    df_explosions = df_battle.iloc[loaders.event_type_rows(df_battle, 'Explosions/Remote violence')]
+
+    # A battle line needs two points, days with a single battle are left out of the fronts stages
+    battles_per_day = df_battles_only.groupby('event_date')['event_date'].transform('size')
+    df_front = df_battles_only[battles_per_day >= 2]
+    lines = fronts.DailyFronts(df_front).ordered_lines(end=fronts.EAST_ANCHORS[0])
+
+    days = max(rows // ROWS_PER_LOSS_DAY, 2)
+    equipment = synthetic_losses(loaders.read_equipment_losses(DATA_DIR.joinpath('russia_losses_equipment.csv')),
+                                 days, rng)
+
+    return {'csv_path': csv_path, 'df_battle': df_battle, 'df_battles_only': df_battles_only,
+            'df_explosions': df_explosions, 'df_front': df_front, 'lines': lines,
+            'polygons': fronts.create_east_polygon(lines, equal_area=True), 'equipment': equipment,
+            'cube': cube.EventCube(df_battle), 'ukraine_map': basemap.Basemap(MAP_DIR)}
+
+
+def event_map_spec(df, base):
+    # The spec of an event map the way the app draws it: base map and event layer
+    points = charts.event_chart(df, by=['event_type'], tooltip=['location:N', 'event_type:O']).mark_circle().encode(
+        color='event_type:O').project(type='mercator', scale=1100, center=[31, 49])
+    return json.dumps(alt.layer(base, points).to_dict())
+
+
+def chart_stage(data):
+    alt.data_transformers.disable_max_rows()
+    ukraine_map = basemap.Basemap(MAP_DIR).for_scale(1100)
+    base = alt.Chart(charts.geo_data(ukraine_map)).mark_geoshape(stroke='black', strokeWidth=0.5).project(
+        type='mercator', scale=1100, center=[31, 49])
+    df_subset = data['df_battle'].iloc[loaders.event_type_rows(data['df_battle'], 'Strategic developments',
+                                                                exclude=True)]
+    return lambda: event_map_spec(df_subset, base)
+
+
+# Every stage: a function of the prepared inputs returning the call to time
+STAGES = {
+    'loaders.read_acled': lambda data: lambda: loaders.read_acled(data['csv_path'], columns=loaders.ANALYSIS_COLUMNS,
+                                                                   countries=['Ukraine']),
+    'loaders.sort_by_event_type': lambda data: lambda: loaders.sort_by_event_type(data['df_battle']),
+    'loaders.enrich_battles': lambda data: lambda: loaders.enrich_battles(data['df_battle']),
+    'basemap.Basemap.assign_oblast': lambda data: lambda: data['ukraine_map'].assign_oblast(
+        data['df_battle']['latitude'], data['df_battle']['longitude']),
+    'cube.EventCube': lambda data: lambda: cube.EventCube(data['df_battle']),
+    'cube.EventCube.query': lambda data: lambda: data['cube'].query('2022-02-24', '2022-04-04', by=['admin1'],
+                                                                     event_type='Battles'),
+    'explosions.find_civilian_explosion_ids': lambda data: lambda: explosions.find_civilian_explosion_ids(
+        data['df_explosions'], data['df_battles_only']),
+    'segments.segment_fronts': lambda data: lambda: segments.segment_fronts(data['df_battles_only']),
+    'fronts.DailyFronts.lines': lambda data: lambda: fronts.DailyFronts(data['df_front']).lines(),
+    'fronts.DailyFronts.ordered_lines': lambda data: lambda: fronts.DailyFronts(data['df_front']).ordered_lines(
+        end=fronts.EAST_ANCHORS[0]),
+    'fronts.create_east_polygon': lambda data: lambda: fronts.create_east_polygon(data['lines'], equal_area=True),
+    'fronts.area_differences': lambda data: lambda: fronts.area_differences(data['polygons']),
+    'losses.daywise': lambda data: lambda: losses.daywise(data['equipment']),
+    'charts.event_map_spec': chart_stage,
+}
+
+
+def time_call(call, repeat):
+    # Seconds of every run, with the garbage of the previous run collected beforehand
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous, threshold):
+    # Ratio of every timing to the one of a previous run, the stages above threshold are regressions
+    before = {(result['stage'], result['size']): result['median_s'] for result in previous['results']}
+    regressions = []
+    print('\ncompared to {}:'.format(previous.get('commit')))
+    for result in results:
+        key = (result['stage'], result['size'])
+        if key not in before:
+            continue
+        ratio = result['median_s'] / before[key]
+        regression = ratio > threshold
+        print('{:40s} {:>8d} {:8.2f}x{}'.format(key[0], key[1], ratio, '  REGRESSION' if regression else ''))
+        if regression:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 200000],
+                        help='rows of the synthetic ACLED export')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of every stage, the median is reported')
+    parser.add_argument('--stages', nargs='+', metavar='stage',
+                        help='stages to run, out of {} (default: all)'.format(', '.join(STAGES)))
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic data')
+    parser.add_argument('--output', type=Path, help='JSON file to write the timings to')
+    parser.add_argument('--compare', type=Path, help='JSON file of a previous run to compare to')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='ratio to the previous run above which a stage counts as a regression')
+    args = parser.parse_args()
+
+    stages = args.stages or list(STAGES)
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error('unknown stages: {}'.format(', '.join(unknown)))
+
+    results = []
+    print('{:40s} {:>8s} {:>10s} {:>10s}'.format('stage', 'size', 'median s', 'min s'))
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            data = prepare(size, tmp, np.random.default_rng(args.seed))
+            for stage in stages:
+                timings = time_call(STAGES[stage](data), args.repeat)
+                results.append({'stage': stage, 'size': size, 'median_s': float(np.median(timings)),
+                                'min_s': min(timings)})
+                print('{:40s} {:>8d} {:10.4f} {:10.4f}'.format(stage, size, np.median(timings), min(timings)))
+
+    run = {'commit': commit(), 'python': platform.python_version(), 'numpy': np.__version__,
+           'pandas': pd.__version__, 'machine': platform.machine(), 'seed': args.seed, 'results': results}
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(run, indent=2))
+
+    if args.compare is not None:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
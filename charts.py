@@ -0,0 +1,109 @@
+import numpy as np
+import altair as alt
+
+# Above this many events a map shows event counts per hexagon instead of single events
+BIN_THRESHOLD = 5000
+
+# Distance (degrees of latitude) from the centre to a corner of the hexagons
+HEX_SIZE_DEG = 0.15
+
+# Longitudes are scaled by the cosine of this latitude (the centre of the maps)
+# so the hexagons are close to regular on the map
+HEX_REFERENCE_LATITUDE = 49
+
+
+def geo_data(geojson):
+    '''
+      Data of a geojson dict for alt.Chart.
+      Unlike alt.Data(values=...), Altair stores inline data once in the datasets of the spec,
+      by a hash of its content, so every layer drawing the map references the same copy
+      alt.Chart(geo_data(ukraine_map)).mark_geoshape() --> alt.Chart
+    '''
+    return alt.InlineData(values=geojson)
+
+
+def encoded(df, *fields):
+    '''
+      The columns of a dataframe a chart encodes, by name or shorthand, so no other column is
+      serialized into the spec. Layers built from the same columns share one dataset
+      encoded(df_battle_subset_Nov1, 'latitude:Q', 'longitude:Q', 'location:N') --> DataFrame
+    '''
+    return df[list(dict.fromkeys(_field(field) for field in fields))]
+
+
+def hex_cells(latitude, longitude, size=HEX_SIZE_DEG):
+    '''
+      Hexagon of every point, as (row, column) indices and the latitude/longitude of the hexagon centre.
+      The centres form two offset rectangular lattices, every point belongs to the nearest centre of the two
+      hex_cells([50.45], [30.52]) --> (array([224]), array([77]), array([50.4]), array([30.49...]))
+    '''
+    scale = np.cos(np.radians(HEX_REFERENCE_LATITUDE))
+    x = np.asarray(longitude, dtype=np.float64) * scale
+    y = np.asarray(latitude, dtype=np.float64)
+
+    # Pointy-top hexagons: columns sqrt(3)*size apart, rows 1.5*size apart
+    dx, dy = np.sqrt(3) * size, 3 * size
+
+    # Nearest centre on the lattice of even rows and on the lattice of odd rows
+    col_even, row_even = np.round(x / dx), np.round(y / dy)
+    col_odd, row_odd = np.floor(x / dx), np.floor(y / dy)
+    dist_even = (x - col_even * dx) ** 2 + (y - row_even * dy) ** 2
+    dist_odd = (x - (col_odd + .5) * dx) ** 2 + (y - (row_odd + .5) * dy) ** 2
+
+    odd = dist_odd < dist_even
+    rows = np.where(odd, 2 * row_odd + 1, 2 * row_even).astype(np.int64)
+    cols = np.where(odd, col_odd, col_even).astype(np.int64)
+
+    cell_latitude = rows * dy / 2
+    cell_longitude = (cols + (rows % 2) / 2) * dx / scale
+    return rows, cols, cell_latitude, cell_longitude
+
+
+def bin_events(df, by=(), keep=(), size=HEX_SIZE_DEG):
+    '''
+      Count the events per hexagon and group of the by columns.
+      The keep columns are reduced to their minimum (e.g. the first event_date, to sort a legend by)
+      bin_events(df_battle_march2022, by=['event_type']) --> DataFrame with event_type, latitude, longitude, count
+    '''
+    by, keep = list(by), list(keep)
+    rows, cols, cell_latitude, cell_longitude = hex_cells(df['latitude'], df['longitude'], size)
+
+    cells = df[by + keep].assign(row=rows, col=cols, latitude=cell_latitude, longitude=cell_longitude, count=1)
+    aggregations = dict({'latitude': 'first', 'longitude': 'first', 'count': 'sum'},
+                        **{column: 'min' for column in keep})
+    binned = cells.groupby(by + ['row', 'col'], observed=True, sort=False).agg(aggregations)
+    return binned.reset_index().drop(columns=['row', 'col'])
+
+
+def _field(shorthand):
+    # 'location:N' --> 'location'
+    return shorthand.split(':')[0]
+
+
+def event_chart(df, by=(), tooltip=(), keep=(), threshold=BIN_THRESHOLD, size=HEX_SIZE_DEG):
+    '''
+      Chart of an event map with latitude, longitude and the tooltip encoded, to be completed with a mark,
+      a color and a projection.
+      Only the columns the chart uses are sent to the browser. Above threshold events the events are
+      counted per hexagon and group of the by columns (see bin_events), the size of the marks shows the count
+      and the tooltip the by columns and the count
+      event_chart(df_battle_march2022, by=['event_type'], tooltip=['location:N', 'event_type:O']) --> alt.Chart
+    '''
+    by, keep = list(by), list(keep)
+    tooltip = list(tooltip)
+
+    if len(df) <= threshold:
+        return alt.Chart(encoded(df, 'latitude', 'longitude', *by, *keep, *tooltip)).encode(
+            latitude='latitude:Q',
+            longitude='longitude:Q',
+            tooltip=tooltip,
+        )
+
+    binned = bin_events(df, by, keep, size)
+    tooltip = [t for t in tooltip if _field(t) in by] + ['count:Q']
+    return alt.Chart(binned).encode(
+        latitude='latitude:Q',
+        longitude='longitude:Q',
+        size=alt.Size('count:Q', title='Events'),
+        tooltip=tooltip,
+    )
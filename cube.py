@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+import loaders
+
+# Categorical columns of the battle data the events are counted by
+CUBE_DIMENSIONS = ['admin1', 'event_type', 'sub_event_type']
+
+
+class EventCube:
+    '''
+      Number of events and fatalities per day of the war and combination of the dimensions, aggregated once.
+      Only the combinations occurring in the data are stored, as the columns of a (day, combination) array,
+      with prefix sums along the days: the totals of a date range are the difference of two rows,
+      so a query costs the number of combinations instead of a scan of the events.
+      EventCube(df_battle).query('2022-02-24', '2022-03-31', by=['admin1'], event_type='Battles') --> DataFrame
+    '''
+
+    def __init__(self, df, dimensions=CUBE_DIMENSIONS):
+        self.dimensions = list(dimensions)
+        days = df['day_of_war'].to_numpy() if 'day_of_war' in df else loaders.day_of_war(df['event_date'])
+
+        # Combinations of the dimensions occurring in the data (missing values included), one column of the cube each
+        grouped = df.groupby(self.dimensions, observed=True, sort=True, dropna=False)
+        combination = grouped.ngroup().to_numpy()
+        self.combinations = grouped.size().index.to_frame(index=False)
+
+        # Day 0 of the cube is the first day with an event
+        self.first_day = int(days.min()) if len(df) else 0
+        self.n_days = int(days.max()) - self.first_day + 1 if len(df) else 0
+        n_combinations = len(self.combinations)
+        cells = (days.astype(np.int64) - self.first_day) * n_combinations + combination
+        shape = (self.n_days, n_combinations)
+
+        # Prefix sums: row d holds the totals of the days before day d
+        events = np.bincount(cells, minlength=self.n_days * n_combinations).reshape(shape)
+        fatalities = np.bincount(cells, weights=df['fatalities'].to_numpy(), minlength=events.size).reshape(shape)
+        self.events = np.zeros((self.n_days + 1, n_combinations), dtype=np.int32)
+        self.fatalities = np.zeros((self.n_days + 1, n_combinations), dtype=np.int32)
+        np.cumsum(events, axis=0, out=self.events[1:])
+        np.cumsum(fatalities.astype(np.int32), axis=0, out=self.fatalities[1:])
+
+    def dates(self):
+        '''
+          First and last date of the cube
+          cube.dates() --> (Timestamp('2022-02-24 00:00:00'), Timestamp('2023-01-15 00:00:00'))
+        '''
+        first = loaders.WAR_START + pd.Timedelta(days=self.first_day)
+        return first, first + pd.Timedelta(days=max(self.n_days - 1, 0))
+
+    def _row(self, date, default):
+        # Row of the prefix sums before the day of a date, clipped to the cube
+        if date is None:
+            return default
+        return int(np.clip(loaders.day_of_war([date])[0] - self.first_day, 0, self.n_days))
+
+    def _combinations(self, filters):
+        # Combinations matching the filters, a value or a list of values per dimension
+        mask = np.ones(len(self.combinations), dtype=bool)
+        for dimension, values in filters.items():
+            if dimension not in self.dimensions:
+                raise ValueError("{} is not a dimension of the cube".format(dimension))
+            values = [values] if isinstance(values, str) or np.ndim(values) == 0 else list(values)
+            mask &= self.combinations[dimension].isin(values).to_numpy()
+        return mask
+
+    def totals(self, start=None, end=None, **filters):
+        '''
+          Events and fatalities of every combination between start and end (inclusive),
+          every date is included by default
+          cube.totals('2022-12-01', '2023-01-15', event_type='Battles') --> DataFrame (dimensions, events, fatalities)
+        '''
+        start_row = self._row(start, 0)
+        end_row = self._row(None if end is None else pd.Timestamp(end) + pd.Timedelta(days=1), self.n_days)
+        end_row = max(end_row, start_row)
+
+        mask = self._combinations(filters)
+        return self.combinations[mask].assign(
+            events=self.events[end_row, mask] - self.events[start_row, mask],
+            fatalities=self.fatalities[end_row, mask] - self.fatalities[start_row, mask],
+        )
+
+    def query(self, start=None, end=None, by=(), **filters):
+        '''
+          Events and fatalities between start and end (inclusive) summed by the by dimensions,
+          of the combinations matching the filters
+          cube.query('2022-02-24', '2022-03-31', by=['admin1']) --> DataFrame with admin1, events, fatalities
+        '''
+        totals = self.totals(start, end, **filters)
+        if not by:
+            return totals[['events', 'fatalities']].sum()
+        return totals.groupby(list(by), observed=True)[['events', 'fatalities']].sum().reset_index()
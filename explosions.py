@@ -0,0 +1,360 @@
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import geodistance
+
+# Haversine and WGS84 geodesic distances differ by well under 1%, pairs
+# closer than this fraction to the radius are re-checked on the ellipsoid
+GEODESIC_MARGIN = 0.01
+
+# Number of explosions whose candidate battles are expanded at once
+CHUNK_SIZE = 4096
+
+# Below this many explosions the classifier runs serially even when workers are given
+PARALLEL_MIN_EXPLOSIONS = 20000
+
+# Number of date shards per worker, so a shard with many battles does not hold up the others
+SHARDS_PER_WORKER = 4
+
+
+def _to_days(dates):
+    '''
+      Convert a date column to integer days since the epoch
+      _to_days(pd.Series(['2022-02-24'])) --> array([19047])
+    '''
+    return pd.to_datetime(dates).to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+
+class BattleIndex:
+    '''
+      Spatio-temporal index over battles.
+      Battles are bucketed into a geodistance.SphereGrid (cell side = search radius)
+      and sorted by (cell, day), so "any battle within radius_km between day_from and day_to"
+      is answered with a binary search per neighbouring cell.
+    '''
+
+    # Room reserved on either side of the indexed day range for query windows
+    day_pad = 1 << 16
+    day_span = 1 << 18
+
+    def __init__(self, battles_df, radius_km=100):
+        self.radius_km = radius_km
+
+        # Cells are sized on the padded radius so the geodesic re-check never misses a battle
+        self.grid = geodistance.SphereGrid(radius_km * (1 + GEODESIC_MARGIN) / geodistance.EARTH_RADIUS_KM)
+
+        self.lat = battles_df['latitude'].to_numpy(dtype=np.float64)
+        self.lon = battles_df['longitude'].to_numpy(dtype=np.float64)
+        self.days = _to_days(battles_df['event_date'])
+        self.day_origin = self.days.min() if len(self.days) else 0
+
+        keys = self._keys(self.grid.cell_ids(self.lat, self.lon), self.days)
+
+        # Sort battles by (cell, day) so each window is a contiguous slice
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.lat = self.lat[order]
+        self.lon = self.lon[order]
+
+    def _keys(self, cell_ids, days):
+        # Days are offset so that look-back windows never go negative
+        return cell_ids * self.day_span + (days - self.day_origin + self.day_pad)
+
+    def any_within(self, lat, lon, day_from, day_to, chunk_size=CHUNK_SIZE):
+        '''
+          For every query point return True if a battle lies within radius_km
+          and its day is in [day_from, day_to] (inclusive, days since epoch)
+          index.any_within(lat, lon, day_from, day_to) --> array([ True, False, ...])
+        '''
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        day_from = np.asarray(day_from, dtype=np.int64)
+        day_to = np.asarray(day_to, dtype=np.int64)
+
+        found = np.zeros(len(lat), dtype=bool)
+        if len(self.keys) == 0 or len(lat) == 0:
+            return found
+
+        for start in range(0, len(lat), chunk_size):
+            stop = min(start + chunk_size, len(lat))
+            q_lat, q_lon = lat[start:stop], lon[start:stop]
+
+            # Cell ids of the 27 neighbouring cells of every query point
+            neighbour_ids = self.grid.neighbour_ids(q_lat, q_lon).ravel()
+            query_idx = np.repeat(np.arange(stop - start), len(self.grid.offsets))
+
+            # Binary search the (cell, day) window of each neighbouring cell
+            lo = np.searchsorted(self.keys, self._keys(neighbour_ids, day_from[start:stop][query_idx]), 'left')
+            hi = np.searchsorted(self.keys, self._keys(neighbour_ids, day_to[start:stop][query_idx]), 'right')
+
+            # Expand the candidate (query, battle) pairs
+            pair_query, pair_battle = geodistance.expand_ranges(query_idx, lo, hi)
+            if len(pair_query) == 0:
+                continue
+
+            dist = geodistance.haversine_km(q_lat[pair_query], q_lon[pair_query],
+                                            self.lat[pair_battle], self.lon[pair_battle])
+
+            # Clear hits and misses on the sphere, re-check the pairs close to the radius on the ellipsoid
+            hit = dist < self.radius_km * (1 - GEODESIC_MARGIN)
+            border = ~hit & (dist < self.radius_km * (1 + GEODESIC_MARGIN))
+            found[start + pair_query[hit]] = True
+
+            # Skip queries that are already settled by a clear hit
+            border &= ~found[start + pair_query]
+            border_query, border_battle = pair_query[border], pair_battle[border]
+            dist = geodistance.geodesic_km(q_lat[border_query], q_lon[border_query],
+                                           self.lat[border_battle], self.lon[border_battle])
+            found[start + border_query[dist < self.radius_km]] = True
+
+        return found
+
+
+def _classify_shard(shard):
+    # Runs in a worker process: the arrays are memory-mapped, only the slices of the shard are read
+    array_dir, explosion_rows, battle_rows, radius_km, days_before, days_after = shard
+    names = ('explosion_lat', 'explosion_lon', 'explosion_days', 'battle_lat', 'battle_lon', 'battle_days')
+    arrays = {name: np.load(os.path.join(array_dir, name + '.npy'), mmap_mode='r') for name in names}
+
+    battles_df = pd.DataFrame({
+        'event_date': np.asarray(arrays['battle_days'][battle_rows]).astype('datetime64[D]'),
+        'latitude': arrays['battle_lat'][battle_rows],
+        'longitude': arrays['battle_lon'][battle_rows],
+    })
+    index = BattleIndex(battles_df, radius_km)
+
+    days = np.asarray(arrays['explosion_days'][explosion_rows])
+    return index.any_within(arrays['explosion_lat'][explosion_rows], arrays['explosion_lon'][explosion_rows],
+                            days - days_before + 1, days + days_after - 1)
+
+
+def _sharded_battle_nearby_mask(explosions_df, battles_df, radius_km, days_before, days_after, workers):
+    '''
+      battle_nearby_mask split into date ranges of explosions, each classified in a worker process
+      against the battles of its range padded by the look-back and look-ahead windows
+    '''
+    days = _to_days(explosions_df['event_date'])
+    battle_days = _to_days(battles_df['event_date'])
+
+    # Sort both by day so every shard and its battles are contiguous slices
+    order = np.argsort(days, kind='stable')
+    battle_order = np.argsort(battle_days, kind='stable')
+    sorted_days = days[order]
+    sorted_battle_days = battle_days[battle_order]
+
+    with tempfile.TemporaryDirectory() as array_dir:
+        # The workers memory-map these arrays instead of receiving copies of the dataframes
+        arrays = {
+            'explosion_lat': explosions_df['latitude'].to_numpy(dtype=np.float64)[order],
+            'explosion_lon': explosions_df['longitude'].to_numpy(dtype=np.float64)[order],
+            'explosion_days': sorted_days,
+            'battle_lat': battles_df['latitude'].to_numpy(dtype=np.float64)[battle_order],
+            'battle_lon': battles_df['longitude'].to_numpy(dtype=np.float64)[battle_order],
+            'battle_days': sorted_battle_days,
+        }
+        for name, values in arrays.items():
+            np.save(os.path.join(array_dir, name + '.npy'), values)
+
+        # Shards of equal numbers of explosions, never splitting a day
+        bounds = np.searchsorted(sorted_days, sorted_days[np.linspace(0, len(days) - 1, workers * SHARDS_PER_WORKER + 1)
+                                                          .astype(np.int64)[1:-1]], 'left')
+        bounds = np.unique(np.concatenate([[0], bounds, [len(days)]]))
+
+        shards = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            lo = np.searchsorted(sorted_battle_days, sorted_days[start] - days_before + 1, 'left')
+            hi = np.searchsorted(sorted_battle_days, sorted_days[stop - 1] + days_after - 1, 'right')
+            shards.append((array_dir, slice(start, stop), slice(lo, hi), radius_km, days_before, days_after))
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            sorted_mask = np.concatenate(list(pool.map(_classify_shard, shards)))
+
+    # Back to the order of the explosions dataframe
+    mask = np.empty(len(days), dtype=bool)
+    mask[order] = sorted_mask
+    return mask
+
+
+def battle_nearby_mask(explosions_df, battles_df, radius_km=100, days_before=21, days_after=10, workers=None):
+    '''
+      For every explosion return True if a battle happened within radius_km
+      strictly between days_before days before and days_after days after it.
+      With workers > 1 (and at least PARALLEL_MIN_EXPLOSIONS explosions) the explosions are split into
+      date ranges classified in that many processes, with the same result as the serial path
+      battle_nearby_mask(df_explosions, df_battles_only) --> array([False,  True, ...])
+    '''
+    if workers is not None and workers > 1 and len(explosions_df) >= PARALLEL_MIN_EXPLOSIONS and len(battles_df):
+        return _sharded_battle_nearby_mask(explosions_df, battles_df, radius_km, days_before, days_after, workers)
+
+    index = BattleIndex(battles_df, radius_km)
+
+    days = _to_days(explosions_df['event_date'])
+    return index.any_within(explosions_df['latitude'], explosions_df['longitude'],
+                            days - days_before + 1, days + days_after - 1)
+
+
+def find_civilian_explosion_ids(explosions_df, battles_df, radius_km=100, days_before=21, days_after=10, workers=None):
+    '''
+      Return the data_id of every explosion that has no battle within radius_km
+      strictly between days_before days before and days_after days after it
+      find_civilian_explosion_ids(df_explosions, df_battles_only) --> [9796215, 9796219, ...]
+    '''
+    battle_nearby = battle_nearby_mask(explosions_df, battles_df, radius_km, days_before, days_after, workers)
+    return explosions_df['data_id'][~battle_nearby].tolist()
+
+
+# Bump when the classification logic changes so old cache entries are not reused
+CLASSIFIER_VERSION = 1
+
+# Number of cache entries kept on disk, least recently used entries are evicted first
+CACHE_MAX_ENTRIES = 8
+
+
+# Columns that identify an explosion / a battle for the classifier
+EXPLOSION_COLUMNS = ['data_id', 'event_date', 'latitude', 'longitude']
+BATTLE_COLUMNS = ['event_date', 'latitude', 'longitude']
+
+
+def _row_hashes(df, columns):
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def classify_incremental(state, explosions_df, battles_df, radius_km=100, days_before=21, days_after=10,
+                         workers=None):
+    '''
+      Update a previous classification with new explosions and battles.
+      state is the dict returned by the previous call (or None for a full classification).
+      Only new explosions and known civilian explosions whose [-days_before, +days_after] window
+      contains a new battle are re-evaluated; if battles were removed or changed, or the
+      parameters differ, everything is classified again (in workers processes, see battle_nearby_mask).
+      classify_incremental(state, df_explosions, df_battles_only) --> ([9796215, ...], new_state)
+    '''
+    params = {'version': CLASSIFIER_VERSION, 'radius_km': radius_km,
+              'days_before': days_before, 'days_after': days_after}
+    explosion_hashes = _row_hashes(explosions_df, EXPLOSION_COLUMNS)
+    battle_hashes = _row_hashes(battles_df, BATTLE_COLUMNS)
+
+    if (state is None or state['params'] != params
+            or not np.isin(state['battle_hashes'], battle_hashes).all()):
+        civilian = ~battle_nearby_mask(explosions_df, battles_df, radius_km, days_before, days_after, workers)
+    else:
+        # Reuse the previous flags of explosions that are unchanged
+        previous = pd.Series(state['civilian'], index=state['explosion_hashes'])
+        known = np.isin(explosion_hashes, state['explosion_hashes'])
+        civilian = np.ones(len(explosions_df), dtype=bool)
+        civilian[known] = previous.reindex(explosion_hashes[known]).to_numpy()
+
+        days = _to_days(explosions_df['event_date'])
+        battle_days = _to_days(battles_df['event_date'])
+
+        # New battles can only turn known civilian explosions into battle explosions
+        new_battles = ~np.isin(battle_hashes, state['battle_hashes'])
+        if new_battles.any():
+            new_days = battle_days[new_battles]
+            affected = (known & civilian
+                        & (days >= new_days.min() - days_after + 1) & (days <= new_days.max() + days_before - 1))
+            if affected.any():
+                civilian[affected] = ~battle_nearby_mask(explosions_df[affected], battles_df[new_battles],
+                                                         radius_km, days_before, days_after, workers)
+
+        # New explosions are checked against the battles around their dates only
+        if (~known).any():
+            window = ((battle_days >= days[~known].min() - days_before + 1)
+                      & (battle_days <= days[~known].max() + days_after - 1))
+            civilian[~known] = ~battle_nearby_mask(explosions_df[~known], battles_df[window],
+                                                   radius_km, days_before, days_after, workers)
+
+    state = {'params': params, 'explosion_hashes': explosion_hashes,
+             'civilian': civilian, 'battle_hashes': battle_hashes}
+    return explosions_df['data_id'][civilian].tolist(), state
+
+
+def _load_state(path):
+    try:
+        with np.load(path) as stored:
+            return {'params': json.loads(str(stored['params'])),
+                    'explosion_hashes': stored['explosion_hashes'],
+                    'civilian': stored['civilian'],
+                    'battle_hashes': stored['battle_hashes']}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _save_state(path, state):
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'wb') as f:
+        np.savez(f, params=json.dumps(state['params']), explosion_hashes=state['explosion_hashes'],
+                 civilian=state['civilian'], battle_hashes=state['battle_hashes'])
+    os.replace(tmp, path)
+
+
+def _frame_digest(hasher, df, columns):
+    # Hash the values (not the index) of the columns the classifier reads
+    hasher.update(pd.util.hash_pandas_object(df[columns], index=False).to_numpy().tobytes())
+    hasher.update(str(len(df)).encode())
+
+
+def classification_key(explosions_df, battles_df, radius_km=100, days_before=21, days_after=10):
+    '''
+      Return a content hash of the classifier inputs and parameters
+      classification_key(df_explosions, df_battles_only) --> '3f1c...e9'
+    '''
+    hasher = hashlib.sha256()
+    hasher.update(json.dumps({'version': CLASSIFIER_VERSION, 'radius_km': radius_km,
+                              'days_before': days_before, 'days_after': days_after}).encode())
+    _frame_digest(hasher, explosions_df, EXPLOSION_COLUMNS)
+    _frame_digest(hasher, battles_df, BATTLE_COLUMNS)
+    return hasher.hexdigest()
+
+
+def _evict(cache_dir, max_entries):
+    entries = sorted(cache_dir.glob('civ_explosions_*.parquet'), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in entries[max_entries:]:
+        stale.unlink(missing_ok=True)
+
+
+def cached_civilian_explosion_ids(explosions_df, battles_df, cache_dir, radius_km=100, days_before=21,
+                                  days_after=10, max_entries=CACHE_MAX_ENTRIES, workers=None):
+    '''
+      find_civilian_explosion_ids backed by a disk cache in cache_dir.
+      Entries are Parquet files named after classification_key, so a change in the input
+      battles/explosions or in the parameters never serves a stale result.
+      On a miss the last classification is updated incrementally (see classify_incremental).
+      cached_civilian_explosion_ids(df_explosions, df_battles_only, './Data/cache') --> [9796215, ...]
+    '''
+    cache_dir = Path(cache_dir)
+    key = classification_key(explosions_df, battles_df, radius_km, days_before, days_after)
+    entry = cache_dir.joinpath('civ_explosions_{}.parquet'.format(key))
+
+    if entry.exists():
+        try:
+            ids = pd.read_parquet(entry)['data_id'].tolist()
+            # Mark the entry as recently used
+            os.utime(entry)
+            return ids
+        except Exception:
+            # Unreadable entry (e.g. a partial write), recompute it below
+            entry.unlink(missing_ok=True)
+
+    # Start from the last classification so only new data is evaluated
+    state_path = cache_dir.joinpath('civ_explosions_state.npz')
+    ids, state = classify_incremental(_load_state(state_path), explosions_df, battles_df,
+                                      radius_km, days_before, days_after, workers)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    _save_state(state_path, state)
+
+    # Write to a temporary file first so readers never see a partial entry
+    tmp = entry.with_suffix('.tmp')
+    pd.DataFrame({'data_id': pd.Series(ids, dtype=explosions_df['data_id'].dtype)}).to_parquet(tmp, index=False)
+    os.replace(tmp, entry)
+    _evict(cache_dir, max_entries)
+
+    return ids
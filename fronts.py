@@ -0,0 +1,393 @@
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+# Anchor points closing the front polygons, as (longitude, latitude) like the battle lines.
+# Eastern front, from https://latitudelongitude.org/ua/<city>/
+EAST_ANCHORS = np.array([
+    (30.73262, 46.47747),   # odessa
+    (33.5224, 44.58883),    # sevastopol
+    (36.4706, 45.3607),     # kerch
+    (37.54131, 47.09514),   # mariupol
+    (39.31706, 48.56705),   # luhansk
+    (36.94108, 50.29078),   # vovchansk
+])
+
+# Northern front, from Google searches for "<town> ukraine longitude and latitude"
+NORTH_ANCHORS = np.array([
+    (31.1837, 52.0601),     # dobryanka
+    (33.2891, 52.3332),     # hremyach
+    (34.0412, 52.1837),     # seredyna
+])
+
+ANCHORS = {'east': EAST_ANCHORS, 'north': NORTH_ANCHORS}
+
+# Coordinates of the battle data
+GEOGRAPHIC_CRS = 'EPSG:4326'
+
+# Lambert azimuthal equal-area projection for Europe, in metres.
+# Areas computed in it are true areas, unlike squared degrees on raw longitude/latitude
+EQUAL_AREA_CRS = 'EPSG:3035'
+
+# Buffer (in metres) applied to the polygons before differencing them
+AREA_BUFFER_M = 1000
+
+# Below this many days the geometry stage runs serially even when workers are given
+PARALLEL_MIN_DAYS = 256
+
+
+def assign_front(latitude, longitude):
+    '''
+      Assign every point (e.g. the centre of a front found by segments.segment_fronts) to the 'North' or
+      'East' front, whichever chain of anchor points is nearer. The eastern anchors go round the south
+      from Odesa to Vovchansk, so the southern battles belong to the eastern front
+      assign_front([50.45, 46.64], [30.52, 32.61]) --> Categorical(['North', 'East'])
+    '''
+    points = shapely.points(np.asarray(longitude, dtype=np.float64), np.asarray(latitude, dtype=np.float64))
+    distance = np.column_stack([shapely.distance(points, shapely.linestrings(ANCHORS[front]))
+                                for front in ('north', 'east')])
+    codes = distance.argmin(axis=1).astype(np.int8) if len(distance) else np.array([], dtype=np.int8)
+    return pd.Categorical.from_codes(codes, categories=['North', 'East'])
+
+
+class DailyFronts:
+    '''
+      Battles of one front grouped by date once.
+      Dates keep the order in which they first appear in the dataframe and the battles
+      of every date are stored as one contiguous slice of the coordinate arrays
+      (in dataframe order), so per-day values are computed without re-filtering the dataframe.
+      DailyFronts(df_eastern_front).lines() --> [<LINESTRING (...)>, ...]
+    '''
+
+    def __init__(self, battles_df):
+        codes, self.dates = pd.factorize(battles_df['event_date'])
+
+        # Stable sort keeps the dataframe order of the battles within each day
+        self.order = np.argsort(codes, kind='stable')
+        self.latitude = battles_df['latitude'].to_numpy(dtype=np.float64)[self.order]
+        self.longitude = battles_df['longitude'].to_numpy(dtype=np.float64)[self.order]
+
+        self.counts = np.bincount(codes, minlength=len(self.dates))
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)])
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _reduce(self, ufunc, values):
+        if len(self) == 0:
+            return np.array([], dtype=values.dtype)
+        return ufunc.reduceat(values, self.offsets[:-1])
+
+    def max_latitude(self):
+        '''
+          Maximum latitude of the battles of every day
+        '''
+        return self._reduce(np.maximum, self.latitude)
+
+    def max_longitude(self):
+        '''
+          Maximum longitude of the battles of every day
+        '''
+        return self._reduce(np.maximum, self.longitude)
+
+    def coords(self, day):
+        '''
+          (longitude, latitude) coordinates of the battles of the day at position day
+          fronts.coords(0) --> array([[37.99, 48.59], ...])
+        '''
+        start, stop = self.offsets[day], self.offsets[day + 1]
+        return np.column_stack([self.longitude[start:stop], self.latitude[start:stop]])
+
+    def lines(self):
+        '''
+          Return an array with the battle line of every day.
+          A day with a single battle cannot make a line, the line of the previous day is used instead
+          (wrapping around to the last day for the first one, as list indexing did before).
+        '''
+        days = np.arange(len(self))
+        source = np.where(self.counts > 1, days, (days - 1) % max(len(self), 1))
+
+        # Gather the coordinate slices of the source days into one array
+        lengths = self.counts[source]
+        starts = self.offsets[source]
+        idx = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+        return shapely.linestrings(self.longitude[idx], self.latitude[idx], indices=np.repeat(days, lengths))
+
+    def spines(self, end=None):
+        '''
+          Battles of every day in their order along the front: the longest path of the minimum spanning tree
+          of the battles of the day. The spanning tree is built on the Delaunay edges, in longitude/latitude with
+          the longitude scaled by the cosine of the mean latitude of the day, so its edges never cross and the
+          path is a simple line. Battles at the same location are counted once, battles off the path (behind
+          the front) are left out. With end, a (longitude, latitude) point, every path finishes at its end
+          nearer to that point. Returns the positions in the coordinate arrays and the day of every point
+          fronts.spines(end=EAST_ANCHORS[0]) --> (array([3, 0, 4, ...]), array([0, 0, 0, ...]))
+        '''
+        if len(self) == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+        day = np.repeat(np.arange(len(self)), self.counts)
+        mean_latitude = self._reduce(np.add, self.latitude) / np.maximum(self.counts, 1)
+        x = self.longitude * np.cos(np.radians(mean_latitude))[day]
+        y = self.latitude
+
+        # Distinct locations of every day, sorted by day
+        order = np.lexsort((y, x, day))
+        distinct = np.ones(len(order), dtype=bool)
+        distinct[1:] = (np.diff(day[order]) != 0) | (np.diff(x[order]) != 0) | (np.diff(y[order]) != 0)
+        points = order[distinct]
+        point_day = day[points]
+
+        # Delaunay edges of every day, as pairs of distinct locations
+        ids = {key: i for i, key in enumerate(zip(point_day.tolist(), x[points].tolist(), y[points].tolist()))}
+        multipoints = shapely.multipoints(np.column_stack([x[points], y[points]]), indices=point_day)
+        triangulation = shapely.delaunay_triangles(multipoints, only_edges=True)
+        edges, edge_day = shapely.get_parts(triangulation, return_index=True)
+        ends = shapely.get_coordinates(edges).reshape(-1, 2, 2)
+        first = [ids[key] for key in zip(edge_day.tolist(), ends[:, 0, 0].tolist(), ends[:, 0, 1].tolist())]
+        second = [ids[key] for key in zip(edge_day.tolist(), ends[:, 1, 0].tolist(), ends[:, 1, 1].tolist())]
+        lengths = np.hypot(*(ends[:, 0] - ends[:, 1]).T)
+
+        # Minimum spanning forest (Kruskal), one tree per day since the edges never join two days
+        parent = list(range(len(points)))
+        neighbours = [[] for _ in range(len(points))]
+        for edge in np.argsort(lengths, kind='stable').tolist():
+            a, b = first[edge], second[edge]
+            root_a, root_b = a, b
+            while parent[root_a] != root_a:
+                parent[root_a] = root_a = parent[parent[root_a]]
+            while parent[root_b] != root_b:
+                parent[root_b] = root_b = parent[parent[root_b]]
+            if root_a != root_b:
+                parent[root_a] = root_b
+                neighbours[a].append((b, lengths[edge]))
+                neighbours[b].append((a, lengths[edge]))
+
+        def farthest(start):
+            # Point of the tree farthest from start, and the previous point on the path to every point
+            distance = {start: 0.0}
+            previous = {start: -1}
+            stack = [start]
+            while stack:
+                point = stack.pop()
+                for neighbour, length in neighbours[point]:
+                    if neighbour not in distance:
+                        distance[neighbour] = distance[point] + length
+                        previous[neighbour] = point
+                        stack.append(neighbour)
+            return max(distance, key=distance.get), previous
+
+        # Longest path of every tree: the farthest point from the farthest point of any start
+        path = []
+        for start in np.searchsorted(point_day, np.arange(len(self))).tolist():
+            far_point, _ = farthest(start)
+            point, previous = farthest(far_point)
+            while point != -1:
+                path.append(point)
+                point = previous[point]
+
+        path = np.array(path, dtype=np.int64)
+        idx, idx_day = points[path], point_day[path]
+        if end is None or len(idx) == 0:
+            return idx, idx_day
+
+        # Reverse the paths ending on the wrong side
+        lengths = np.bincount(idx_day, minlength=len(self))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        head, tail = idx[offsets[:-1]], idx[offsets[1:] - 1]
+        reverse = (np.hypot(self.longitude[head] - end[0], self.latitude[head] - end[1])
+                   < np.hypot(self.longitude[tail] - end[0], self.latitude[tail] - end[1]))
+        position = np.arange(len(idx)) - offsets[idx_day]
+        flipped = offsets[idx_day] + lengths[idx_day] - 1 - position
+        return idx[np.where(reverse[idx_day], flipped, np.arange(len(idx)))], idx_day
+
+    def ordered_lines(self, end=None, tolerance=None):
+        '''
+          Return an array with the battle line of every day, following the front (see spines)
+          instead of the dataframe order, so the front polygons do not cross themselves.
+          With end (see spines), every line finishes at its end nearer to that point
+          (the first anchor of the front closing it into a polygon). With tolerance, in degrees, the lines
+          are simplified without becoming self-intersecting. A day with a single location cannot make a line,
+          the line of the last day before it with one is used instead (wrapping around to the last such day
+          for the first days, like lines does). If no day has two locations, every line is the location of its
+          day twice.
+          fronts.ordered_lines(end=EAST_ANCHORS[0]) --> [<LINESTRING (...)>, ...]
+        '''
+        idx, idx_day = self.spines(end)
+        lengths = np.bincount(idx_day, minlength=len(self))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+        days = np.arange(len(self))
+        has_line = lengths > 1
+        if not has_line.any():
+            # Degenerate lines, as lines gives for days whose battles share one location
+            lines = shapely.linestrings(np.repeat(self.longitude[idx], 2), np.repeat(self.latitude[idx], 2),
+                                        indices=np.repeat(idx_day, 2))
+            return shapely.simplify(lines, tolerance, preserve_topology=True) if tolerance else lines
+
+        # Gather the paths of the source days, as in lines: the last day with a line
+        last = np.maximum.accumulate(np.where(has_line, days, -1))
+        source = np.where(last >= 0, last, days[has_line][-1])
+        gathered = np.repeat(offsets[source] - np.cumsum(lengths[source]) + lengths[source], lengths[source])
+        idx = idx[gathered + np.arange(lengths[source].sum())]
+
+        lines = shapely.linestrings(self.longitude[idx], self.latitude[idx], indices=np.repeat(days, lengths[source]))
+        if tolerance:
+            lines = shapely.simplify(lines, tolerance, preserve_topology=True)
+        return lines
+
+    def positions(self, end=None):
+        '''
+          Position of every battle (in dataframe order) along the path of its day (see spines),
+          NaN for the battles off the path, e.g. to order the points of a line chart
+          fronts.positions(end=EAST_ANCHORS[0]) --> array([2., nan, 0., ...])
+        '''
+        idx, idx_day = self.spines(end)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(idx_day, minlength=len(self)))])
+        positions = np.full(len(self.order), np.nan)
+        positions[self.order[idx]] = np.arange(len(idx)) - offsets[idx_day]
+        return positions
+
+
+def _map_chunks(func, n, workers, *arrays):
+    '''
+      Apply func to consecutive chunks of the arrays (of length n) in a thread pool and concatenate the
+      results in order, so the result is the same as func(*arrays). Shapely releases the GIL in its
+      vectorized functions, so the chunks run in parallel. Runs serially for workers=None or small inputs
+    '''
+    if workers is None or workers <= 1 or n < PARALLEL_MIN_DAYS:
+        return func(*arrays)
+
+    bounds = np.linspace(0, n, workers + 1).astype(np.int64)
+    chunks = [[array[start:stop] for array in arrays] for start, stop in zip(bounds[:-1], bounds[1:])]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda chunk: func(*chunk), chunks))
+    return np.concatenate(results)
+
+
+def _front_polygons(lines, anchors):
+    '''
+      Close every line with the anchor points into a polygon, for a single line or an array of lines
+    '''
+    single = isinstance(lines, shapely.Geometry)
+    lines = np.atleast_1d(np.asarray(lines, dtype=object))
+
+    coords, index = shapely.get_coordinates(lines, return_index=True)
+
+    # Append the anchors after the coordinates of every line
+    coords = np.concatenate([coords, np.tile(anchors, (len(lines), 1))])
+    index = np.concatenate([index, np.repeat(np.arange(len(lines)), len(anchors))])
+    order = np.argsort(index, kind='stable')
+
+    polygons = shapely.polygons(shapely.linearrings(coords[order], indices=index[order]))
+    return polygons[0] if single else polygons
+
+
+def _to_equal_area(geometries):
+    return gpd.GeoSeries(geometries, crs=GEOGRAPHIC_CRS).to_crs(EQUAL_AREA_CRS).to_numpy()
+
+
+def to_equal_area(geometries, workers=None):
+    '''
+      Reproject longitude/latitude geometries to EQUAL_AREA_CRS in batched calls (split across workers threads)
+      to_equal_area(battle_lines_east) --> array([<LINESTRING (6330088.444 3220457.15, ...)>, ...])
+    '''
+    geometries = np.atleast_1d(np.asarray(geometries, dtype=object))
+    return _map_chunks(_to_equal_area, len(geometries), workers, geometries)
+
+
+@functools.lru_cache()
+def _equal_area_anchors(front):
+    # The anchors never change, so they are projected only once per process
+    anchors = shapely.points(ANCHORS[front])
+    return shapely.get_coordinates(to_equal_area(anchors))
+
+
+def _create_front_polygon(lines, front, equal_area, workers):
+    if isinstance(lines, shapely.Geometry):
+        return _create_front_polygon(np.array([lines]), front, equal_area, None)[0]
+
+    lines = np.asarray(lines, dtype=object)
+    if not equal_area:
+        return _map_chunks(lambda chunk: _front_polygons(chunk, ANCHORS[front]), len(lines), workers, lines)
+
+    anchors = _equal_area_anchors(front)
+    return _map_chunks(lambda chunk: _front_polygons(_to_equal_area(chunk), anchors), len(lines), workers, lines)
+
+
+def create_east_polygon(lines, equal_area=False, workers=None):
+    '''
+      This function takes a line (or an array of lines) and creates a polygon for the eastern part of the front.
+      With equal_area=True the polygon is built in EQUAL_AREA_CRS (metres) instead of longitude/latitude.
+      With workers the lines are processed in chunks on that many threads.
+      create_east_polygon(line) -->  \
+      POLYGON ((37.9999 48.5956, 38.1 48.2, 30.73262 46.47747, 33.5224 44.58883, 36.4706 45.3607, ...))
+    '''
+    return _create_front_polygon(lines, 'east', equal_area, workers)
+
+
+def create_north_polygon(lines, equal_area=False, workers=None):
+    '''
+      This function takes a line (or an array of lines) and creates a polygon for the northern part of the front.
+      With equal_area=True the polygon is built in EQUAL_AREA_CRS (metres) instead of longitude/latitude.
+      With workers the lines are processed in chunks on that many threads.
+      create_north_polygon(line) -->
+        POLYGON ((30.5 51.2, 31 51, 31.1837 52.0601, 33.2891 52.3332, 34.0412 52.1837, 30.5 51.2))
+    '''
+    return _create_front_polygon(lines, 'north', equal_area, workers)
+
+
+def calculate_area_diff(polygon1, polygon2, buffer=AREA_BUFFER_M):
+    '''
+    This function calculate the area difference from one equal-area polygon from another
+    (or element-wise for arrays), in km²
+    calculate_area_diff(polygon1, polygon2) --> 10776.532963558311
+    '''
+    return shapely.area(shapely.symmetric_difference(shapely.buffer(polygon1, buffer),
+                                                     shapely.buffer(polygon2, buffer))) / 1e6
+
+
+def area_differences(polygons, buffer=AREA_BUFFER_M, workers=None):
+    '''
+      Area difference between every polygon and the previous one (0 for the first one),
+      in the squared units of the polygons.
+      Every polygon is buffered once and reused for both comparisons it takes part in.
+      Pairs of consecutive days are independent, with workers they are split across that many threads
+      area_differences(battle_polygons_east) --> array([0., 1.0776533e+10, ...])
+    '''
+    polygons = np.asarray(polygons, dtype=object)
+    buffered = _map_chunks(lambda chunk: shapely.buffer(chunk, buffer), len(polygons), workers, polygons)
+
+    def symmetric_difference_area(current, previous):
+        return shapely.area(shapely.symmetric_difference(current, previous))
+
+    differences = np.zeros(len(buffered))
+    if len(buffered) > 1:
+        differences[1:] = _map_chunks(symmetric_difference_area, len(buffered) - 1, workers,
+                                      buffered[1:], buffered[:-1])
+    return differences
+
+
+def front_movement(dates, polygons, direction, front, workers=None):
+    '''
+      Compute the area difference between the equal-area polygons of consecutive days once and derive
+      the signed (direction of victory) and cumulative series from it.
+      Returns one tidy dataframe with a row per day, areas in km²:
+      date, front, conquered_difference (absolute), signed_difference, cumulative_difference
+      front_movement(battle_dates_east, battle_polygons_east, df_east_dir_vic, 'East') --> DataFrame
+    '''
+    conquered_difference = area_differences(polygons, workers=workers) / 1e6
+    signed_difference = conquered_difference * np.asarray(direction)
+
+    return pd.DataFrame({
+        'date': dates,
+        'front': front,
+        'conquered_difference': conquered_difference,
+        'signed_difference': signed_difference,
+        'cumulative_difference': np.cumsum(signed_difference),
+    })
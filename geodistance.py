@@ -0,0 +1,241 @@
+import numpy as np
+import geopy.distance
+
+# Mean earth radius (km) used by the haversine mode
+EARTH_RADIUS_KM = 6371.0088
+
+# WGS84 ellipsoid used by the geodesic mode (same ellipsoid geopy uses by default)
+WGS84_A_KM = 6378.137
+WGS84_F = 1 / 298.257223563
+WGS84_B_KM = (1 - WGS84_F) * WGS84_A_KM
+
+# Haversine differs from the WGS84 geodesic by at most ~0.56%.
+# The geodesic mode agrees with geopy.distance.geodesic to better than 1 mm
+# for every pair that is not (nearly) antipodal; those fall back to geopy.
+HAVERSINE_TOLERANCE = 0.0056
+GEODESIC_TOLERANCE_KM = 1e-6
+
+# Number of rows of the distance matrix computed at once (rows x columns floats in memory)
+CHUNK_SIZE = 1024
+
+METHODS = ('haversine', 'geodesic')
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    '''
+      Great-circle distance in km between (broadcastable) arrays of coordinates in degrees
+      haversine_km(50.45, 30.52, 49.99, 36.23) --> 409.35...
+    '''
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def geodesic_km(lat1, lon1, lat2, lon2, max_iter=200):
+    '''
+      Distance in km on the WGS84 ellipsoid between (broadcastable) arrays of coordinates
+      in degrees, using Vincenty's inverse formula
+      geodesic_km(50.45, 30.52, 49.99, 36.23) --> 410.61...
+    '''
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64)
+                                                   for x in (lat1, lon1, lat2, lon2)))
+    shape = lat1.shape
+    lat1, lon1, lat2, lon2 = (x.ravel() for x in (lat1, lon1, lat2, lon2))
+
+    f = WGS84_F
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    sin_U1, cos_U1 = np.sin(U1), np.cos(U1)
+    sin_U2, cos_U2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    converged = np.zeros(L.shape, dtype=bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(max_iter):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(cos_U2 * sin_lam, cos_U1 * sin_U2 - sin_U1 * cos_U2 * cos_lam)
+            cos_sigma = sin_U1 * sin_U2 + cos_U1 * cos_U2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+
+            # Coincident points have sin_sigma == 0
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cos_U1 * cos_U2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+
+            # Points on the equator have cos2_alpha == 0
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sin_U1 * sin_U2 / cos2_alpha)
+
+            C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            lam_prev = lam
+            lam = L + (1 - C) * f * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+
+            converged = np.abs(lam - lam_prev) < 1e-12
+            if converged.all():
+                break
+
+        u2 = cos2_alpha * (WGS84_A_KM ** 2 - WGS84_B_KM ** 2) / WGS84_B_KM ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+        distance = WGS84_B_KM * A * (sigma - delta_sigma)
+
+    # Vincenty does not converge for nearly antipodal points, use geopy for those
+    for i in np.flatnonzero(~converged | ~np.isfinite(distance)):
+        distance[i] = geopy.distance.geodesic((lat1[i], lon1[i]), (lat2[i], lon2[i])).km
+
+    return distance.reshape(shape)[()]
+
+
+def _pairwise(method):
+    if method == 'haversine':
+        return haversine_km
+    if method == 'geodesic':
+        return geodesic_km
+    raise ValueError("method must be one of {}, got {!r}".format(METHODS, method))
+
+
+def iter_distance_chunks(lat1, lon1, lat2, lon2, method='haversine', chunk_size=CHUNK_SIZE):
+    '''
+      Yield (row_slice, distances) blocks of the distance matrix between points 1 (rows)
+      and points 2 (columns), at most chunk_size rows at a time
+      iter_distance_chunks(lat1, lon1, lat2, lon2) --> (slice(0, 1024), array([[...], ...])), ...
+    '''
+    distance = _pairwise(method)
+    lat1, lon1 = np.asarray(lat1, dtype=np.float64), np.asarray(lon1, dtype=np.float64)
+    lat2, lon2 = np.asarray(lat2, dtype=np.float64), np.asarray(lon2, dtype=np.float64)
+
+    for start in range(0, len(lat1), chunk_size):
+        rows = slice(start, min(start + chunk_size, len(lat1)))
+        yield rows, distance(lat1[rows, None], lon1[rows, None], lat2[None, :], lon2[None, :])
+
+
+def distance_matrix(lat1, lon1, lat2, lon2, method='haversine', chunk_size=CHUNK_SIZE):
+    '''
+      Return the (n1, n2) matrix of distances in km between points 1 and points 2
+      distance_matrix([50.45], [30.52], [49.99, 46.48], [36.23, 30.73]) --> array([[409.35..., 441.72...]])
+    '''
+    matrix = np.empty((len(lat1), len(lat2)), dtype=np.float64)
+    for rows, block in iter_distance_chunks(lat1, lon1, lat2, lon2, method, chunk_size):
+        matrix[rows] = block
+    return matrix
+
+
+def within_mask(lat1, lon1, lat2, lon2, radius_km, method='haversine', chunk_size=CHUNK_SIZE):
+    '''
+      Return a boolean (n1, n2) matrix, True where the points are closer than radius_km
+      within_mask([50.45], [30.52], [49.99, 46.48], [36.23, 30.73], 420) --> array([[ True, False]])
+    '''
+    mask = np.empty((len(lat1), len(lat2)), dtype=bool)
+    for rows, block in iter_distance_chunks(lat1, lon1, lat2, lon2, method, chunk_size):
+        mask[rows] = block < radius_km
+    return mask
+
+
+def any_within(lat1, lon1, lat2, lon2, radius_km, method='haversine', chunk_size=CHUNK_SIZE):
+    '''
+      For every point 1 return True if any point 2 is closer than radius_km
+      any_within([50.45], [30.52], [49.99, 46.48], [36.23, 30.73], 420) --> array([ True])
+    '''
+    found = np.zeros(len(lat1), dtype=bool)
+    for rows, block in iter_distance_chunks(lat1, lon1, lat2, lon2, method, chunk_size):
+        found[rows] = (block < radius_km).any(axis=1)
+    return found
+
+
+def unit_vectors(lat, lon):
+    '''
+      Convert latitude/longitude in degrees to 3D points on the unit sphere
+      unit_vectors([0.0], [0.0]) --> array([[1., 0., 0.]])
+    '''
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def expand_ranges(owners, lo, hi):
+    '''
+      Expand the ranges [lo, hi) of positions (e.g. from np.searchsorted) into one (owner, position) pair
+      per position, empty or reversed ranges give no pair
+      expand_ranges([0, 1], [2, 5], [4, 6]) --> (array([0, 0, 1]), array([2, 3, 5]))
+    '''
+    counts = np.maximum(np.asarray(hi) - np.asarray(lo), 0)
+    return np.repeat(owners, counts), np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+
+class SphereGrid:
+    '''
+      3D grid of cubic cells of side cell_size on the unit sphere (cell_size is a chord, in earth radii).
+      Points closer than cell_size lie in the same or neighbouring cells, so a search within that distance
+      only looks at the 27 cells around a point: sort the points by cell id once and binary search the
+      neighbour_ids of every query.
+      SphereGrid(100 / EARTH_RADIUS_KM).cell_ids([50.45], [30.52]) --> array([1710187])
+    '''
+
+    # The 27 offsets of a cell and its neighbours
+    offsets = np.array([[dx, dy, dz] for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)])
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells_per_axis = int(np.ceil(2 / cell_size)) + 3
+
+    def _cells(self, lat, lon):
+        # Integer (x, y, z) cell of every point, the sphere fits in cells 1 to cells_per_axis - 2
+        return np.floor((unit_vectors(lat, lon) + 1) / self.cell_size).astype(np.int64) + 1
+
+    def _ids(self, cells):
+        n = self.cells_per_axis
+        return (cells[..., 0] * n + cells[..., 1]) * n + cells[..., 2]
+
+    def cell_ids(self, lat, lon):
+        '''
+          Id of the cell of every point
+        '''
+        return self._ids(self._cells(lat, lon))
+
+    def neighbour_ids(self, lat, lon):
+        '''
+          Ids of the 27 cells around every point (its own cell included), as an (n, 27) array
+        '''
+        return self._ids(self._cells(lat, lon)[:, None, :] + self.offsets[None, :, :])
+
+
+def neighbour_pairs(lat, lon, radius_km, chunk_size=CHUNK_SIZE):
+    '''
+      Every pair (i, j) of distinct points closer than radius_km (haversine), in both orders.
+      Points are bucketed into a SphereGrid with cells as large as the radius, so a point is only
+      compared with the points of the 27 cells around it: near-linear in the number of points
+      when their density is bounded
+      neighbour_pairs([50.45, 50.46, 46.48], [30.52, 30.53, 30.73], 5) --> (array([0, 1]), array([1, 0]))
+    '''
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    if len(lat) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+    # Points closer than the radius are closer than its chord, i.e. in neighbouring cells
+    grid = SphereGrid(2 * np.sin(radius_km / (2 * EARTH_RADIUS_KM)))
+
+    # Points sorted by cell, so the points of a cell are a contiguous slice
+    ids = grid.cell_ids(lat, lon)
+    order = np.argsort(ids, kind='stable')
+    sorted_ids = ids[order]
+
+    pairs_i, pairs_j = [], []
+    for start in range(0, len(lat), chunk_size):
+        stop = min(start + chunk_size, len(lat))
+        neighbour_ids = grid.neighbour_ids(lat[start:stop], lon[start:stop]).ravel()
+        query = np.repeat(np.arange(start, stop), len(grid.offsets))
+
+        # Expand the candidate pairs of the neighbouring cells and keep the ones within the radius
+        i, position = expand_ranges(query, np.searchsorted(sorted_ids, neighbour_ids, 'left'),
+                                    np.searchsorted(sorted_ids, neighbour_ids, 'right'))
+        j = order[position]
+        within = (i != j) & (haversine_km(lat[i], lon[i], lat[j], lon[j]) < radius_km)
+        pairs_i.append(i[within])
+        pairs_j.append(j[within])
+    return np.concatenate(pairs_i), np.concatenate(pairs_j)
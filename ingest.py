@@ -0,0 +1,26 @@
+'''
+  Convert the CSV files in Data/ into typed Parquet files in Data/parquet/ (ACLED exports
+  are streamed, so a global export need not fit in memory).
+  The app reads the Parquet files (only the columns it needs) when they are newer
+  than the CSV files and falls back to the CSV files otherwise.
+
+  python ingest.py
+'''
+import argparse
+from pathlib import Path
+
+import loaders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-path', type=Path, default=Path.cwd().joinpath('Data'),
+                        help='directory containing the CSV files')
+    args = parser.parse_args()
+
+    for parquet in loaders.ingest(args.data_path):
+        print('{} written successfully'.format(parquet))
+
+
+if __name__ == '__main__':
+    main()
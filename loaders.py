@@ -0,0 +1,369 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+# Column types of the ACLED export.
+# Repeated labels are categoricals, ids fit in 32 bits and float32 keeps coordinates to ~1 m.
+# Only the event ids and free text columns are plain strings
+ACLED_DTYPES = {
+    'data_id': 'int32',
+    'iso': 'int16',
+    'event_id_cnty': 'string',
+    'event_id_no_cnty': 'int32',
+    'year': 'int16',
+    'time_precision': 'int8',
+    'event_type': 'category',
+    'sub_event_type': 'category',
+    'actor1': 'category',
+    'assoc_actor_1': 'category',
+    'inter1': 'int8',
+    'actor2': 'category',
+    'assoc_actor_2': 'category',
+    'inter2': 'int8',
+    'interaction': 'int16',
+    'region': 'category',
+    'country': 'category',
+    'admin1': 'category',
+    'admin2': 'category',
+    'admin3': 'category',
+    'location': 'category',
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'geo_precision': 'int8',
+    'source': 'string',
+    'source_scale': 'category',
+    'notes': 'string',
+    'fatalities': 'int32',
+    'timestamp': 'int64',
+    'iso3': 'category',
+}
+
+# ACLED columns loaded by the app, every other column is dropped at read time
+ANALYSIS_COLUMNS = ['data_id', 'event_date', 'year', 'event_type', 'sub_event_type', 'admin1',
+                    'location', 'latitude', 'longitude', 'fatalities']
+
+# Rows of an ACLED export read at a time by iter_acled
+ACLED_CHUNK_ROWS = 100000
+
+# Order of the event types after sort_by_event_type: battles and explosions first,
+# strategic developments last, so the subsets the app uses are contiguous blocks of rows
+EVENT_TYPE_ORDER = ['Battles', 'Explosions/Remote violence']
+EVENT_TYPE_LAST = 'Strategic developments'
+
+# First day of the war, day 0 of day_of_war
+WAR_START = pd.Timestamp('2022-02-24')
+
+# Column types of the Kaggle losses datasets, the loss counts are inferred
+EQUIPMENT_DTYPES = {
+    'day': 'int16',
+    'greatest losses direction': 'string',
+}
+
+PERSONNEL_DTYPES = {
+    'day': 'int16',
+    'personnel*': 'category',
+}
+
+
+def parquet_path(csv_path):
+    '''
+      Location of the Parquet copy of a CSV file written by ingest()
+      parquet_path('./Data/civ_explosions.csv') --> PosixPath('Data/parquet/civ_explosions.parquet')
+    '''
+    csv_path = Path(csv_path)
+    return csv_path.parent.joinpath('parquet', csv_path.stem + '.parquet')
+
+
+def _fresh_parquet(csv_path):
+    # The Parquet copy is used unless the CSV was modified after it was written
+    csv_path = Path(csv_path)
+    parquet = parquet_path(csv_path)
+    if parquet.exists() and (not csv_path.exists() or parquet.stat().st_mtime >= csv_path.stat().st_mtime):
+        return parquet
+    return None
+
+
+def read_battles(path, columns=None):
+    '''
+      Read an ACLED export with typed columns and a parsed event_date.
+      Only the given columns are read, from the Parquet copy if there is an up to date one.
+      read_battles('./Data/acled_battle_data_23Feb.csv', columns=ANALYSIS_COLUMNS) --> DataFrame
+    '''
+    parquet = _fresh_parquet(path)
+    if parquet is not None:
+        return pd.read_parquet(parquet, columns=columns)
+    return pd.read_csv(path, sep=',', usecols=columns, dtype=ACLED_DTYPES, parse_dates=['event_date'])
+
+
+def _acled_filter(countries, event_types, start, end):
+    # The filters of iter_acled as a pyarrow expression, evaluated against the Parquet row group statistics
+    conditions = []
+    if countries is not None:
+        conditions.append(ds.field('country').isin(list(countries)))
+    if event_types is not None:
+        conditions.append(ds.field('event_type').isin(list(event_types)))
+    if start is not None:
+        conditions.append(ds.field('event_date') >= pa.scalar(pd.Timestamp(start).to_datetime64()))
+    if end is not None:
+        conditions.append(ds.field('event_date') <= pa.scalar(pd.Timestamp(end).to_datetime64()))
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _filter_chunk(chunk, countries, event_types, start, end):
+    # The rows of a CSV chunk passing the filters of iter_acled
+    keep = np.ones(len(chunk), dtype=bool)
+    if countries is not None:
+        keep &= chunk['country'].isin(countries).to_numpy()
+    if event_types is not None:
+        keep &= chunk['event_type'].isin(event_types).to_numpy()
+    if start is not None:
+        keep &= (chunk['event_date'] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        keep &= (chunk['event_date'] <= pd.Timestamp(end)).to_numpy()
+    return chunk[keep]
+
+
+def iter_acled(path, columns=None, countries=None, event_types=None, start=None, end=None,
+               chunksize=ACLED_CHUNK_ROWS):
+    '''
+      Stream an ACLED export of any size in typed batches of at most chunksize rows.
+      Only the rows of the given countries and event types between start and end (inclusive) are kept,
+      and only the given columns. The CSV is read chunk by chunk, the Parquet copy (if up to date)
+      through a dataset scan that skips the row groups no row of which passes the filters, so memory
+      depends on chunksize, not on the size of the file.
+      Batches without rows are dropped, except the first one which gives the columns and their types
+      iter_acled('./Data/acled_battle_data_23Feb.csv', countries=['Ukraine'], start='2022-02-24') --> DataFrames
+    '''
+    first = True
+    for batch in _acled_batches(path, columns, countries, event_types, start, end, chunksize):
+        if len(batch) or first:
+            # Categories of the rows filtered out (e.g. the admin1 of other countries) are dropped
+            yield batch.apply(lambda column: column.cat.remove_unused_categories()
+                              if isinstance(column.dtype, pd.CategoricalDtype) else column)
+            first = False
+
+
+def _acled_batches(path, columns, countries, event_types, start, end, chunksize):
+    parquet = _fresh_parquet(path)
+    if parquet is not None:
+        dataset = ds.dataset(parquet, format='parquet')
+        scanner = dataset.scanner(columns=columns, filter=_acled_filter(countries, event_types, start, end),
+                                  batch_size=chunksize)
+        for batch in scanner.to_batches():
+            yield batch.to_pandas()
+        return
+
+    # The filtered columns are read along with the requested ones and dropped after filtering
+    filtered = [name for name, values in [('country', countries), ('event_type', event_types),
+                                          ('event_date', start), ('event_date', end)] if values is not None]
+    usecols = None if columns is None else list(dict.fromkeys(list(columns) + filtered))
+
+    chunks = pd.read_csv(path, sep=',', usecols=usecols, dtype=ACLED_DTYPES, parse_dates=['event_date'],
+                         chunksize=chunksize)
+    for chunk in chunks:
+        chunk = _filter_chunk(chunk, countries, event_types, start, end)
+        yield chunk if columns is None else chunk[list(columns)]
+
+
+def concat_batches(batches):
+    '''
+      Concatenate the batches of iter_acled into one dataframe.
+      Every batch has its own categories, they are unioned so the columns stay categorical
+      concat_batches(iter_acled(path, countries=['Ukraine'])) --> DataFrame
+    '''
+    batches = list(batches)
+    for name, dtype in batches[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = pd.api.types.union_categoricals([batch[name] for batch in batches]).categories
+            batches = [batch.assign(**{name: batch[name].cat.set_categories(categories)}) for batch in batches]
+    return pd.concat(batches, ignore_index=True)
+
+
+def read_acled(path, columns=None, countries=None, event_types=None, start=None, end=None,
+               chunksize=ACLED_CHUNK_ROWS):
+    '''
+      Read the rows and columns of an ACLED export passing the filters of iter_acled, without
+      ever holding more than one chunk of the rows filtered out in memory
+      read_acled('./Data/acled_battle_data_23Feb.csv', columns=ANALYSIS_COLUMNS, countries=['Ukraine']) --> DataFrame
+    '''
+    return concat_batches(iter_acled(path, columns, countries, event_types, start, end, chunksize))
+
+
+def sort_by_event_type(df):
+    '''
+      Stable-sort an ACLED dataframe so every event type is a contiguous block of rows
+      (see EVENT_TYPE_ORDER), keeping the original order within each event type
+      sort_by_event_type(df_battle) --> DataFrame
+    '''
+    rank = np.full(len(df), len(EVENT_TYPE_ORDER), dtype=np.int8)
+    for position, event_type in enumerate(EVENT_TYPE_ORDER):
+        rank[(df['event_type'] == event_type).to_numpy()] = position
+    rank[(df['event_type'] == EVENT_TYPE_LAST).to_numpy()] = len(EVENT_TYPE_ORDER) + 1
+    return df.iloc[np.argsort(rank, kind='stable')].reset_index(drop=True)
+
+
+def event_type_rows(df, event_type, exclude=False):
+    '''
+      Row slice of an event type in a dataframe sorted by sort_by_event_type
+      (or of every other event type with exclude=True, for the last event type).
+      Slicing with it returns a view instead of a copy of the rows
+      df_battle.iloc[event_type_rows(df_battle, 'Battles')] --> DataFrame of the battles
+    '''
+    matches = np.flatnonzero((df['event_type'] == event_type).to_numpy())
+    if len(matches) == 0:
+        return slice(len(df), len(df)) if exclude else slice(0, 0)
+
+    start, stop = matches[0], matches[-1] + 1
+    if stop - start != len(matches):
+        raise ValueError("dataframe is not sorted by event type, use sort_by_event_type first")
+    if not exclude:
+        return slice(start, stop)
+    if stop != len(df):
+        raise ValueError("only the last event type can be excluded with a slice")
+    return slice(0, start)
+
+
+def day_of_war(dates):
+    '''
+      Number of days since WAR_START
+      day_of_war([datetime.date(2022, 3, 7)]) --> array([11])
+    '''
+    return ((pd.to_datetime(dates) - WAR_START) // pd.Timedelta(days=1)).to_numpy(dtype=np.int16)
+
+
+def enrich_battles(df):
+    '''
+      Add the derived columns the app uses, computed once after loading:
+      month (first day of the month), month_year (ordered categorical label, e.g. 'March, 2022')
+      and day_of_war
+      enrich_battles(df_battle) --> DataFrame
+    '''
+    df = df.copy(deep=False)
+
+    # One label per month rather than per row
+    month = df['event_date'].dt.to_period('M')
+    months = pd.PeriodIndex(month.dropna().unique()).sort_values()
+    labels = months.strftime('%B, %Y')
+    df['month'] = month.dt.to_timestamp()
+    df['month_year'] = pd.Categorical.from_codes(months.get_indexer(month), categories=labels, ordered=True)
+
+    df['day_of_war'] = day_of_war(df['event_date'])
+    return df
+
+
+def read_battles_preview(path, rows=5):
+    '''
+      Read the first rows of an ACLED export with every column, without reading the whole file
+      read_battles_preview('./Data/acled_battle_data_23Feb.csv') --> DataFrame (5 rows)
+    '''
+    parquet = _fresh_parquet(path)
+    if parquet is not None:
+        batch = next(pq.ParquetFile(parquet).iter_batches(batch_size=rows))
+        return batch.to_pandas()
+    return pd.read_csv(path, sep=',', nrows=rows, dtype=ACLED_DTYPES, parse_dates=['event_date'])
+
+
+def read_equipment_losses(path):
+    '''
+      Read the cumulative Russian equipment losses with a parsed date column
+      read_equipment_losses('./Data/russia_losses_equipment.csv') --> DataFrame
+    '''
+    parquet = _fresh_parquet(path)
+    if parquet is not None:
+        return pd.read_parquet(parquet)
+    return pd.read_csv(path, sep=',', dtype=EQUIPMENT_DTYPES, parse_dates=['date'])
+
+
+def read_equipment_correction(path):
+    '''
+      Read the corrections of the equipment losses (counts added by a change of classification)
+      with a parsed date column
+      read_equipment_correction('./Data/russia_losses_equipment_correction.csv') --> DataFrame
+    '''
+    parquet = _fresh_parquet(path)
+    if parquet is not None:
+        return pd.read_parquet(parquet)
+    return pd.read_csv(path, sep=',', dtype={'day': 'int16'}, parse_dates=['date'])
+
+
+def read_personnel_losses(path):
+    '''
+      Read the cumulative Russian personnel losses with a parsed date column
+      read_personnel_losses('./Data/russia_losses_personnel.csv') --> DataFrame
+    '''
+    parquet = _fresh_parquet(path)
+    if parquet is not None:
+        return pd.read_parquet(parquet)
+    return pd.read_csv(path, sep=',', dtype=PERSONNEL_DTYPES, parse_dates=['date'])
+
+
+def _csv_reader(csv_path):
+    # ACLED exports (and the civilian explosions subset of one) use the ACLED schema
+    if csv_path.name.startswith('acled') or csv_path.name == 'civ_explosions.csv':
+        return read_battles
+    if csv_path.name == 'russia_losses_equipment.csv':
+        return read_equipment_losses
+    if csv_path.name == 'russia_losses_equipment_correction.csv':
+        return read_equipment_correction
+    if csv_path.name == 'russia_losses_personnel.csv':
+        return read_personnel_losses
+    return pd.read_csv
+
+
+def _write_acled_parquet(csv_path, parquet):
+    # Stream an ACLED export into Parquet, one row group per chunk.
+    # The categoricals get 32 bit dictionary indices so every chunk has the same schema
+    writer = None
+    try:
+        for batch in iter_acled(csv_path):
+            table = pa.Table.from_pandas(batch, preserve_index=False)
+            if writer is None:
+                schema = pa.schema([field.with_type(pa.dictionary(pa.int32(), pa.string()))
+                                    if pa.types.is_dictionary(field.type) else field for field in table.schema],
+                                   metadata=table.schema.metadata)
+                writer = pq.ParquetWriter(parquet, schema)
+            writer.write_table(table.cast(schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def ingest(data_path):
+    '''
+      Convert every CSV file in data_path into a typed Parquet file in data_path/parquet,
+      which the readers above use instead of the CSV from then on.
+      ACLED exports are converted chunk by chunk, so they need not fit in memory
+      ingest('./Data') --> [PosixPath('Data/parquet/civ_explosions.parquet'), ...]
+    '''
+    written = []
+    for csv_path in sorted(Path(data_path).glob('*.csv')):
+        # Read the CSV itself, not a previous Parquet copy
+        parquet = parquet_path(csv_path)
+        parquet.unlink(missing_ok=True)
+        parquet.parent.mkdir(parents=True, exist_ok=True)
+
+        if csv_path.name.startswith('acled'):
+            _write_acled_parquet(csv_path, parquet)
+        else:
+            _csv_reader(csv_path)(csv_path).to_parquet(parquet, index=False)
+        written.append(parquet)
+    return written
+
+
+def read_geojson(path):
+    '''
+      Read a geojson file into a dict
+      read_geojson('./Data/ukraine_geojson-master/UA_FULL_Ukraine.geojson') --> {'type': 'FeatureCollection', ...}
+    '''
+    with open(path, encoding="utf8") as f:
+        return json.load(f)
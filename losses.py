@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+# Columns identifying the day of a row in the Kaggle losses datasets, every other numeric column is a loss count
+INDEX_COLUMNS = ['date', 'day']
+
+
+def loss_columns(df):
+    '''
+      The loss count columns of a Kaggle losses dataset: the numeric columns besides date and day
+      loss_columns(df_personnel) --> ['personnel', 'POW']
+    '''
+    #The meaning of biufc: b bool, i int (signed), u unsigned int, f float, c complex
+    return [name for name in df.columns if name not in INDEX_COLUMNS and df[name].dtype.kind in 'biufc']
+
+
+def daywise(df, corrections=None, monotonic=True):
+    '''
+      Convert the cumulative losses of a Kaggle losses dataset to losses per day, all loss columns at once.
+      The result has one row per calendar day between the first and the last date: the losses of a day
+      missing from the dataset are NaN and the losses since the previous report are counted on the next one.
+      corrections (e.g. loaders.read_equipment_correction) are counts added to the cumulative losses on
+      their date by a change of classification rather than by losses, they are taken out of that day.
+      With monotonic, a cumulative count going down (a revised report) is held at its maximum until it is
+      exceeded again instead of giving negative losses.
+      The first row keeps its cumulative values (the losses since the start of the war),
+      the non numeric columns are kept as they are
+      daywise(df_equipment, corrections=df_correction) --> DataFrame (date, day, aircraft, ...) with float32 losses
+    '''
+    columns = loss_columns(df)
+
+    # One row per calendar day, a date reported twice keeps its last report
+    if not (df['date'].is_monotonic_increasing and df['date'].is_unique):
+        df = df.sort_values('date', kind='stable').drop_duplicates('date', keep='last')
+    df = df.set_index('date')
+    dates = pd.date_range(df.index[0], df.index[-1], freq='D', name='date')
+    first_day = df['day'].iloc[0]
+    if len(dates) != len(df):
+        df = df.reindex(dates)
+
+    # Cumulative counts as one (day, column) array, a copy (not a view of float columns) as it is corrected in place
+    cumulative = df[columns].to_numpy(dtype=np.float64, copy=True)
+    reported = ~np.isnan(cumulative)
+
+    # A correction changes the cumulative counts from its date on
+    if corrections is not None:
+        corrected = [name for name in loss_columns(corrections) if name in columns]
+        offsets = corrections.groupby('date')[corrected].sum().reindex(dates, fill_value=0).cumsum()
+        cumulative[:, [columns.index(name) for name in corrected]] -= offsets.to_numpy(dtype=np.float64)
+
+    # Carry the last reported count over the days without a report (the running maximum with monotonic)
+    if monotonic:
+        filled = np.fmax.accumulate(cumulative, axis=0)
+    else:
+        last = np.maximum.accumulate(np.where(reported, np.arange(len(dates))[:, None], 0), axis=0)
+        filled = np.take_along_axis(cumulative, last, axis=0)
+
+    # Losses since the previous report, on the days with a report
+    by_day = np.empty_like(cumulative)
+    by_day[0] = cumulative[0]
+    np.subtract(filled[1:], filled[:-1], out=by_day[1:])
+    by_day[~reported] = np.nan
+
+    df_by_day = df.reset_index()
+    df_by_day['day'] = (first_day + np.arange(len(dates))).astype(np.int16)
+    df_by_day[columns] = by_day.astype(np.float32)
+    return df_by_day
+
+
+def tidy(df_by_day):
+    '''
+      Long view of day-wise losses: one row per day and loss category with a reported loss
+      tidy(daywise(df_equipment)) --> DataFrame with date, day, category ('aircraft', ...), losses
+    '''
+    columns = loss_columns(df_by_day)
+
+    # Columns stacked one after the other, like DataFrame.melt
+    values = df_by_day[columns].to_numpy().ravel(order='F')
+    codes = np.repeat(np.arange(len(columns), dtype=np.int8), len(df_by_day))
+    reported = ~np.isnan(values)
+
+    return pd.DataFrame({
+        'date': np.tile(df_by_day['date'].to_numpy(), len(columns))[reported],
+        'day': np.tile(df_by_day['day'].to_numpy(), len(columns))[reported],
+        'category': pd.Categorical.from_codes(codes[reported], categories=columns),
+        'losses': values[reported],
+    })
@@ -0,0 +1,348 @@
+import datetime
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import basemap
+import explosions
+import fronts
+import loaders
+import losses
+import segments
+
+# Bump when a stage changes what it computes, artifacts of other versions are then ignored
+ARTIFACT_VERSION = 4
+
+# Input files, in the data directory
+BATTLE_DATA = 'acled_battle_data_23Feb.csv'
+EQUIPMENT_LOSSES = 'russia_losses_equipment.csv'
+EQUIPMENT_CORRECTION = 'russia_losses_equipment_correction.csv'
+PERSONNEL_LOSSES = 'russia_losses_personnel.csv'
+MAP_DIR = 'ukraine_geojson-master'
+
+# Countries of the battle data the app analyses, the events of other countries are dropped at read time
+# (the battle data may be any ACLED export, up to the global one)
+COUNTRIES = ['Ukraine']
+
+# Days on which the battle lines are compared month by month
+MONTHLY_DATES = [datetime.date(2022, 3, 7) + datetime.timedelta(days=x * 30) for x in range(0, 11)]
+
+MANIFEST = 'manifest.json'
+
+logger = logging.getLogger(__name__)
+
+
+def load_battles(data_path):
+    '''
+      The ACLED data as the app uses it: events in COUNTRIES, analysis columns, sorted by event type,
+      with derived columns. The front and oblast of every event are precomputed (see event_regions).
+      The export is streamed, see loaders.iter_acled
+      load_battles('./Data') --> DataFrame
+    '''
+    df = loaders.read_acled(Path(data_path).joinpath(BATTLE_DATA), columns=loaders.ANALYSIS_COLUMNS,
+                            countries=COUNTRIES)
+    return loaders.enrich_battles(loaders.sort_by_event_type(df))
+
+
+def with_fronts(df_battle):
+    '''
+      The battle data with the front of every battle (see segments.anchored_fronts, NaN for the other events).
+      The fronts are found in the battles of the whole war, instead of splitting the map with fixed boxes.
+      A frame that has them already (joined from event_regions) is returned as it is
+      with_fronts(df_battle) --> DataFrame with front
+    '''
+    if 'front' in df_battle.columns:
+        return df_battle
+
+    rows = loaders.event_type_rows(df_battle, 'Battles')
+    battle_fronts = segments.anchored_fronts(df_battle.iloc[rows])
+    codes = np.full(len(df_battle), -1, dtype=np.int8)
+    codes[rows] = battle_fronts.codes
+
+    df_battle = df_battle.copy(deep=False)
+    df_battle['front'] = pd.Categorical.from_codes(codes, categories=battle_fronts.categories)
+    return df_battle
+
+
+def event_regions(df_battle, ukraine_map):
+    '''
+      The front (see with_fronts) and the oblast (see basemap.Basemap.assign_oblast) of every event, by data_id
+      event_regions(df_battle, basemap.Basemap('./Data/ukraine_geojson-master')) --> DataFrame (data_id, front, oblast)
+    '''
+    df_battle = with_fronts(df_battle)
+    return pd.DataFrame({'data_id': df_battle['data_id'].to_numpy(), 'front': df_battle['front'].array,
+                         'oblast': ukraine_map.assign_oblast(df_battle['latitude'], df_battle['longitude'])})
+
+
+def join_event_regions(df_battle, regions):
+    '''
+      Add the front and oblast columns of event_regions to the battle data, NaN for the events not in it
+      join_event_regions(df_battle, load('./Data', 'event_regions')) --> DataFrame with front, oblast
+    '''
+    return df_battle.join(regions.set_index('data_id')[['front', 'oblast']], on='data_id')
+
+
+def monthly_battles(battles_df):
+    '''
+      The battles of MONTHLY_DATES
+      monthly_battles(df_battles_only) --> DataFrame
+    '''
+    return battles_df[battles_df['day_of_war'].isin(loaders.day_of_war(MONTHLY_DATES))]
+
+
+def _direction(values, gain):
+    # 1 where the line moved in favour of the Ukrainians (gain is True), -1 otherwise, 0 for the first day
+    return np.concatenate([[0], np.where(gain(np.diff(values)), 1, -1)])
+
+
+def daily_front_movement(battles_df, workers=None):
+    '''
+      Area (km²) the eastern and northern battle lines moved every day, see fronts.front_movement.
+      With workers the polygons and area differences are computed on that many threads
+      daily_front_movement(df_battles_only) --> DataFrame
+    '''
+    df_northern_front = battles_df[battles_df['front'] == 'North']
+    df_eastern_front = battles_df[battles_df['front'] == 'East']
+
+    # Group the battles of both fronts by day, the northern front ends with its battles
+    fronts_north = fronts.DailyFronts(df_northern_front)
+    fronts_east = fronts.DailyFronts(df_eastern_front)
+
+    # A net positive for the Ukrainians is the northern line moving south or the eastern line moving east
+    north_direction = _direction(fronts_north.max_latitude(), lambda diff: diff <= 0)
+    east_direction = _direction(fronts_east.max_longitude(), lambda diff: diff < 0)
+
+    # Battle lines following each front, finishing next to the first anchor closing them into polygons,
+    # projected to an equal-area CRS so areas are in km²
+    lines_north = fronts_north.ordered_lines(end=fronts.NORTH_ANCHORS[0])
+    lines_east = fronts_east.ordered_lines(end=fronts.EAST_ANCHORS[0])
+    polygons_north = fronts.create_north_polygon(lines_north, equal_area=True, workers=workers)
+    polygons_east = fronts.create_east_polygon(lines_east, equal_area=True, workers=workers)
+
+    return pd.concat([
+        fronts.front_movement(fronts_east.dates, polygons_east, east_direction, 'East', workers),
+        fronts.front_movement(fronts_north.dates, polygons_north, north_direction, 'North', workers),
+    ], ignore_index=True)
+
+
+def monthly_front_movement(battles_df, workers=None):
+    '''
+      Absolute area (km²) the battle line moved in every month of MONTHLY_DATES, by month label
+      monthly_front_movement(df_battles_only) --> DataFrame with date ('March, 2022', ...), conquered_difference
+    '''
+    fronts_month = fronts.DailyFronts(monthly_battles(battles_df))
+    direction = _direction(fronts_month.max_longitude(), lambda diff: diff < 0)
+    lines = fronts_month.ordered_lines(end=fronts.EAST_ANCHORS[0])
+    polygons = fronts.create_east_polygon(lines, equal_area=True, workers=workers)
+    movement = fronts.front_movement(fronts_month.dates, polygons, direction, 'East', workers)
+
+    grouped = movement.groupby(movement['date'].dt.strftime('%B, %Y'))['signed_difference'].sum()
+    return grouped.abs().rename('conquered_difference').reset_index()
+
+
+def front_segments(battles_df, min_days=segments.FRONT_WINDOW_DAYS):
+    '''
+      The fronts discovered in the battle data by segments.segment_fronts, with their centre and number of battles
+      every day. Fronts seen on fewer than min_days days (a few battles clustering once) are left out,
+      the others are numbered from 0 in the order they appear
+      front_segments(df_battles_only) --> DataFrame with date, front, battles, latitude, longitude
+    '''
+    _, tracks = segments.segment_fronts(battles_df)
+    days_seen = tracks.groupby('front')['date'].transform('size')
+    tracks = tracks[days_seen >= min_days].reset_index(drop=True)
+    tracks['front'] = pd.factorize(tracks['front'])[0]
+    return tracks
+
+
+def _battles_only(df_battle):
+    return df_battle.iloc[loaders.event_type_rows(df_battle, 'Battles')]
+
+
+# Every stage computes one artifact from the data directory.
+# workers is the number of processes/threads a stage may use itself (None: serial),
+# df_battle is load_battles(data_path), read once for all the stages of BATTLE_DATA (None for the others)
+# and given the fronts once for all the stages of FRONT_STAGES
+
+def _civilian_explosions(data_path, df_battle, workers=None):
+    # An explosion is a civilian explosion if no battle happened within 100km
+    # in the 21 days before or the 10 days after it
+    df_explosions = df_battle.iloc[loaders.event_type_rows(df_battle, 'Explosions/Remote violence')]
+    df_battles_only = df_battle.iloc[loaders.event_type_rows(df_battle, 'Battles')]
+    ids = explosions.cached_civilian_explosion_ids(df_explosions, df_battles_only, Path(data_path).joinpath('cache'),
+                                                   radius_km=100, days_before=21, days_after=10, workers=workers)
+    return pd.DataFrame({'data_id': ids})
+
+
+def _daily_front_movement(data_path, df_battle, workers=None):
+    return daily_front_movement(_battles_only(with_fronts(df_battle)), workers)
+
+
+def _monthly_front_movement(data_path, df_battle, workers=None):
+    return monthly_front_movement(_battles_only(with_fronts(df_battle)), workers)
+
+
+def _front_segments(data_path, df_battle, workers=None):
+    return front_segments(_battles_only(df_battle))
+
+
+def _event_regions(data_path, df_battle, workers=None):
+    return event_regions(df_battle, basemap.Basemap(Path(data_path).joinpath(MAP_DIR)))
+
+
+def _equipment_by_day(data_path, df_battle, workers=None):
+    return losses.daywise(loaders.read_equipment_losses(Path(data_path).joinpath(EQUIPMENT_LOSSES)),
+                          corrections=loaders.read_equipment_correction(Path(data_path).joinpath(EQUIPMENT_CORRECTION)))
+
+
+def _personnel_by_day(data_path, df_battle, workers=None):
+    return losses.daywise(loaders.read_personnel_losses(Path(data_path).joinpath(PERSONNEL_LOSSES)))
+
+
+# Every artifact: the stage computing it and the input files it reads.
+# The stages are independent of each other
+STAGES = {
+    'civilian_explosions': (_civilian_explosions, [BATTLE_DATA]),
+    'daily_front_movement': (_daily_front_movement, [BATTLE_DATA]),
+    'monthly_front_movement': (_monthly_front_movement, [BATTLE_DATA]),
+    'front_segments': (_front_segments, [BATTLE_DATA]),
+    'event_regions': (_event_regions, [BATTLE_DATA, MAP_DIR]),
+    'equipment_by_day': (_equipment_by_day, [EQUIPMENT_LOSSES, EQUIPMENT_CORRECTION]),
+    'personnel_by_day': (_personnel_by_day, [PERSONNEL_LOSSES]),
+}
+
+# The stages using the front of every battle (see with_fronts)
+FRONT_STAGES = ['daily_front_movement', 'monthly_front_movement', 'event_regions']
+
+
+def artifact_dir(data_path):
+    '''
+      Directory of the artifacts of ARTIFACT_VERSION
+      artifact_dir('./Data') --> PosixPath('Data/artifacts/v4')
+    '''
+    return Path(data_path).joinpath('artifacts', 'v{}'.format(ARTIFACT_VERSION))
+
+
+def _input_signature(data_path, inputs):
+    # Size and modification time of the input CSV files, whichever copy the stages read:
+    # writing or deleting the Parquet copies (see loaders.ingest) leaves the artifacts valid.
+    # Without the CSV file, its Parquet copy is the source.
+    # A directory (the map) is signed by the total size and latest modification time of its files
+    signature = {}
+    for name in inputs:
+        path = Path(data_path).joinpath(name)
+        if path.is_dir():
+            stats = [file.stat() for file in sorted(path.iterdir()) if file.is_file()]
+            signature[name] = [path.name, sum(stat.st_size for stat in stats),
+                               max((stat.st_mtime_ns for stat in stats), default=0)]
+            continue
+        if not path.exists():
+            path = loaders.parquet_path(path)
+        stat = path.stat()
+        signature[name] = [path.name, stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+def _reads_battles(name):
+    _, inputs = STAGES[name]
+    return BATTLE_DATA in inputs
+
+
+def compute(data_path, name, stage_workers=None, df_battle=None):
+    '''
+      Compute one artifact without writing it. df_battle is the battle data of load_battles(data_path),
+      read here if the stage needs it and it is not given
+      compute('./Data', 'daily_front_movement') --> DataFrame
+    '''
+    stage, _ = STAGES[name]
+    if df_battle is None and _reads_battles(name):
+        df_battle = load_battles(data_path)
+    return stage(data_path, df_battle, stage_workers)
+
+
+def _build_stage(data_path, name, stage_workers, df_battle):
+    df = compute(data_path, name, stage_workers, df_battle)
+
+    out_dir = artifact_dir(data_path)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(out_dir.joinpath(name + '.parquet'), index=False)
+    return name
+
+
+def build(data_path, names=None, workers=None, stage_workers=None):
+    '''
+      Compute the artifacts (every stage by default) in a process pool of workers processes and write them,
+      with a manifest of the inputs they were computed from, to artifact_dir(data_path).
+      stage_workers is passed on to the stages that can split their own work (see STAGES).
+      The battle data is read, and its fronts found, once and handed to every stage of it
+      build('./Data') --> {'civilian_explosions': PosixPath('Data/artifacts/v4/civilian_explosions.parquet'), ...}
+    '''
+    names = list(STAGES) if names is None else list(names)
+    out_dir = artifact_dir(data_path)
+
+    # The inputs are signed before they are read, an input changing meanwhile makes the artifact stale
+    signatures = {name: _input_signature(data_path, STAGES[name][1]) for name in names}
+    df_battle = load_battles(data_path) if any(_reads_battles(name) for name in names) else None
+    if any(name in FRONT_STAGES for name in names):
+        df_battle = with_fronts(df_battle)
+    stage_battles = [df_battle if _reads_battles(name) else None for name in names]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_build_stage, [data_path] * len(names), names, [stage_workers] * len(names),
+                                stage_battles))
+
+    manifest = _read_manifest(data_path)
+    for name in results:
+        manifest[name] = {'inputs': signatures[name]}
+
+    # Write the manifest atomically so a reader never sees a partial file
+    fd, tmp = tempfile.mkstemp(dir=out_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, out_dir.joinpath(MANIFEST))
+
+    return {name: out_dir.joinpath(name + '.parquet') for name in results}
+
+
+def _read_manifest(data_path):
+    path = artifact_dir(data_path).joinpath(MANIFEST)
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def read_artifact(data_path, name):
+    '''
+      Read an artifact written by build(), or return None if there is none or its inputs changed since
+      read_artifact('./Data', 'daily_front_movement') --> DataFrame
+    '''
+    entry = _read_manifest(data_path).get(name)
+    path = artifact_dir(data_path).joinpath(name + '.parquet')
+    if entry is None or not path.exists():
+        return None
+
+    _, inputs = STAGES[name]
+    if entry['inputs'] != _input_signature(data_path, inputs):
+        return None
+    return pd.read_parquet(path)
+
+
+def load(data_path, name, df_battle=None):
+    '''
+      Read an artifact, computing it instead if it has not been built or is out of date.
+      df_battle, the battle data of load_battles(data_path) if the caller holds it already, is then used
+      instead of reading it again (see compute)
+      load('./Data', 'daily_front_movement', df_battle) --> DataFrame
+    '''
+    df = read_artifact(data_path, name)
+    if df is None:
+        logger.warning('No up to date %s artifact in %s, computing it inline (run precompute.py to build it)',
+                       name, artifact_dir(data_path))
+        df = compute(data_path, name, df_battle=df_battle)
+    return df
@@ -0,0 +1,40 @@
+'''
+  Compute the analysis artifacts of the app (civilian explosions, front movement, discovered fronts,
+  front and oblast of every event, day-wise losses) from the files in Data/ and write them
+  to Data/artifacts/v<version>/.
+  The stages are independent and run in parallel processes. The app reads the artifacts
+  while their input files are unchanged and computes them itself otherwise.
+
+  python precompute.py
+'''
+import argparse
+from pathlib import Path
+
+import pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-path', type=Path, default=Path.cwd().joinpath('Data'),
+                        help='directory containing the input files')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('--stage-workers', type=int, default=None,
+                        help='number of workers a stage may use itself: processes for the civilian '
+                             'explosions classifier, threads for the front polygons (default: serial)')
+    parser.add_argument('stages', nargs='*', metavar='stage',
+                        help='stages to run, out of {} (default: all)'.format(', '.join(pipeline.STAGES)))
+    args = parser.parse_args()
+
+    unknown = [stage for stage in args.stages if stage not in pipeline.STAGES]
+    if unknown:
+        parser.error('unknown stages: {}'.format(', '.join(unknown)))
+
+    written = pipeline.build(args.data_path, names=args.stages or None, workers=args.workers,
+                             stage_workers=args.stage_workers)
+    for path in written.values():
+        print('{} written successfully'.format(path))
+
+
+if __name__ == '__main__':
+    main()
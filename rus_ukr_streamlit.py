@@ -4,12 +4,15 @@ import pandas as pd
 import altair as alt
 from pathlib import Path
 import datetime
-import json
 import datetime
 import geopandas as gpd
-import shapely
-import geopy.distance
-import os
+
+import basemap
+import charts
+import cube
+import fronts
+import loaders
+import pipeline
 
 st.set_page_config(layout="centered",page_title="Russia-Ukraine War Analysis")
 st.title('Russia - Ukraine War EDA')
@@ -46,28 +49,54 @@ with st.expander("Secondary Objectives and Possible Future Analysis"):
 path = Path.cwd()
 
 data_path = path.joinpath('Data')
-russia_losses = data_path.joinpath('russia_losses_equipment.csv')
-russia_losses_p = data_path.joinpath('russia_losses_personnel.csv')
-battle_data = data_path.joinpath('acled_battle_data_23Feb.csv')
+battle_data = data_path.joinpath(pipeline.BATTLE_DATA)
 
 maps = data_path.joinpath("ukraine_geojson-master")
-ukraine_map_path = maps.joinpath("UA_FULL_Ukraine.geojson")
 
-df_equipment = pd.read_csv(russia_losses, sep=',')
-df_personnel = pd.read_csv(russia_losses_p, sep=',')
-df_battle = pd.read_csv(battle_data, sep=',')
+# Every file is parsed once per process, Streamlit hands out copies on every rerun
+
+# The columns the app does not use (free text, actors, codes) are only shown in the preview
+@st.cache_data()
+def get_battle_data():
+    # Rows are grouped by event type so the subsets below are slices instead of copies.
+    # Month labels and day of the war are computed once here instead of per chart,
+    # the front and oblast of every event are joined from their artifact (see pipeline.event_regions)
+    df_battle = pipeline.load_battles(data_path)
+    return pipeline.join_event_regions(df_battle, pipeline.load(data_path, 'event_regions', df_battle))
+
+# The heavy computations (civilian explosions, fronts, front movement, day-wise losses) are done offline
+# by precompute.py, the app only reads their results (and computes them from the battle data it holds
+# if they are missing or stale)
+@st.cache_data()
+def get_artifact(name):
+    return pipeline.load(data_path, name, get_battle_data())
+
+@st.cache_data()
+def get_battle_data_preview():
+    return loaders.read_battles_preview(battle_data)
+
+# The geojson files are read once and shared instead of copied,
+# along with the simplified variants of the map the charts use
+@st.cache_resource()
+def get_ukraine_map():
+    return basemap.Basemap(maps)
+
+# Events and fatalities per day, oblast (from the map, not ACLED's admin1) and event type,
+# summed once so any date range is answered without scanning the events (see cube.EventCube)
+@st.cache_resource()
+def get_event_cube():
+    return cube.EventCube(get_battle_data(), dimensions=['oblast', 'event_type', 'sub_event_type'])
+
+df_battle = get_battle_data()
 
 st.header('Import and analyze the ACLED battle dataset')
 
-st.dataframe(df_battle.head(5).T)
+st.dataframe(get_battle_data_preview().T)
 
 #Check stats for the dataset
 st.markdown('Analyzing the statistics of the data')
 st.dataframe(df_battle.describe().T,height=492)
 
-#Convert event date to datetime
-df_battle['event_date'] = pd.to_datetime(df_battle['event_date'])
-
 #Checking number of entries by day to identify days with greatest activity
 df_battle['event_date'].value_counts()
 
@@ -79,44 +108,36 @@ df_battle['event_type'].unique()''')
 st.dataframe(df_battle['event_type'].value_counts(),width=250)
 
 #Create a subset of the dataset which includes only battles
-df_battles_only = df_battle[df_battle["event_type"] == 'Battles'].copy()
+df_battles_only = df_battle.iloc[loaders.event_type_rows(df_battle, 'Battles')]
 print ("Number of battles:",len(df_battles_only))
 
 #See the sub-event types for the battles dataset
 df_battles_only['sub_event_type'].unique()	
 
-#Convert event date to datetime
-df_battle['event_date'] = pd.to_datetime(df_battle['event_date'])
-
 #Get base Ukraine Map geojson
-with open(ukraine_map_path, encoding="utf8") as f:
-    ukraine_map = json.load(f)
-
-# To identify if app is running on streamlit
-def is_running_on_streamlit():
-     return "HOSTNAME" in os.environ and os.environ['HOSTNAME'] == 'streamlit'
+ukraine_map = get_ukraine_map()
 
 # Defining a function **get_base_Ukraine_map** that returns a map of Ukraine with states/regions outlined
-def get_base_Ukraine_map(title="No Title"):
+def get_base_Ukraine_map(title="No Title", scale=1100, center=[31, 49], width=770, height=500):
     '''
       Return a base map of Ukraine
       with the states outlined
-      with title
+      with title, simplified for the scale it is drawn at
     '''
 
     # Create the base map
-    base = alt.Chart(alt.Data(values=ukraine_map)).mark_geoshape(
+    base = alt.Chart(charts.geo_data(ukraine_map.for_scale(scale))).mark_geoshape(
         stroke='black',
         strokeWidth=0.5
     ).encode(
       color=alt.value('#f5f5f5')
     ).project(
       type='mercator',
-      scale=1100,
-      center=[31, 49] 
+      scale=scale,
+      center=center
   ).properties(
-      width=770,
-      height=500,
+      width=width,
+      height=height,
       title=title
   )
 
@@ -149,7 +170,7 @@ def get_Kyiv_point(size=100):
     return kyiv
 
 #Filter out events tagged as 'Strategic developements'
-df_battle_subset = df_battle[df_battle['event_type'] != 'Strategic developments']
+df_battle_subset = df_battle.iloc[loaders.event_type_rows(df_battle, 'Strategic developments', exclude=True)]
 
 st.markdown("Filter out 'Strategic developments' for the upcoming visualizations")
 st.code('''#Filter out events tagged as 'Strategic developements'
@@ -162,6 +183,28 @@ kyiv = get_Kyiv_point(500)
 
 st.header("Visual Analysis")
 
+st.subheader('Events by oblast over a chosen period')
+
+event_cube = get_event_cube()
+first_date, last_date = event_cube.dates()
+
+# Totals of the selected days straight from the prefix sums of the cube
+selected_start, selected_end = st.slider('Period', min_value=first_date.date(), max_value=last_date.date(),
+                                         value=(first_date.date(), last_date.date()), format='MMM D, YYYY')
+events_by_oblast = event_cube.query(selected_start, selected_end, by=['oblast', 'event_type'])
+events_by_oblast = events_by_oblast[(events_by_oblast['event_type'] != 'Strategic developments')
+                                    & (events_by_oblast['events'] > 0)]
+
+oblast_bars = alt.Chart(events_by_oblast).mark_bar().encode(
+    x=alt.X('sum(events):Q', title='Events'),
+    y=alt.Y('oblast:N', sort='-x', title=None),
+    color=alt.Color('event_type:N', scale=alt.Scale(scheme='dark2'), title='Event type'),
+    tooltip=['oblast:N', 'event_type:N', 'events:Q', 'fatalities:Q'],
+).properties(width=700, title='Events from {:%B %d, %Y} to {:%B %d, %Y}'.format(selected_start, selected_end))
+
+st.altair_chart(oblast_bars.configure_legend(labelLimit=0))
+
+
 st.subheader('Battles and explosions - first 40 days of the war')
 
 #Setting the date range to plot
@@ -176,14 +219,12 @@ df_battle_march2022 = df_battle_subset[(df_battle_subset['event_date'] > start_d
 base = get_base_Ukraine_map("Events in first 40 days of the war")
 
 #Marking all the events in the given date range
-circle_points = alt.Chart(df_battle_march2022).mark_circle(
+#(counted per hexagon when there are too many events to draw one by one)
+circle_points = charts.event_chart(df_battle_march2022, by=['event_type'], tooltip=['location:N','event_type:O']).mark_circle(
     opacity=0.8,
     stroke='black',
     strokeWidth=1,
 ).encode(
-    latitude='latitude:Q',
-    longitude='longitude:Q',
-    tooltip=['location:N','event_type:O'],
     color=alt.Color('event_type:O', scale=alt.Scale(scheme='dark2'))
 ).project(
     type='mercator',
@@ -211,14 +252,12 @@ df_battle_dec2022 = df_battle_subset[(df_battle_subset['event_date'] > start_dat
 base = get_base_Ukraine_map("Events from 1st December 2022 to 15th January 2023")
 
 #Marking all the events in the given date range
-circle_points = alt.Chart(df_battle_dec2022).mark_circle(
+#(counted per hexagon when there are too many events to draw one by one)
+circle_points = charts.event_chart(df_battle_dec2022, by=['event_type'], tooltip=['location:N','event_type:O']).mark_circle(
     opacity=0.8,
     stroke='black',
     strokeWidth=1,
 ).encode(
-    latitude='latitude:Q',
-    longitude='longitude:Q',
-    tooltip=['location:N','event_type:O'],
     color=alt.Color('event_type:O', scale=alt.Scale(scheme='dark2'))
 ).project(
     type='mercator',
@@ -240,7 +279,7 @@ It is also interesting to note that the Eastern front of the Russian offensive h
 st.markdown('Since the Russian offensive failed and they were unable to capture a lot of land in Ukraine, they resorted to remote explosions that had nothing to do with attacks in battles. Primary targets may have been cities, civilian populations, infrastructure such as power grids, radio towers etc.')
 
 # Value counts of event types
-st.write(df_battle_subset['event_type'].value_counts())
+st.write(df_battle_subset['event_type'].cat.remove_unused_categories().value_counts())
 
 st.markdown("Checking for erroneous entries")
 st.code('''#Check whether 'data_id' is unique for every row and there is no faulty entry
@@ -251,67 +290,22 @@ df_battle_subset['data_id'].nunique() == len(df_battle_subset)
 
 
 def calculate_update_civ_explosions():
-    # Get all explosions in the data
-    df_explosions = df_battle[df_battle['event_type']=='Explosions/Remote violence']
-
-    civilian_explosion_ids = []
-
-    # Iterate through every explosion
-    for idx,explosion_row in df_explosions.iterrows():
-
-        # Retrieve explosion location as a tuple
-        explosion_loc = (explosion_row['latitude'],explosion_row['longitude'])
-
-        # Define a flag variable
-        battle_explosion = False
-
-        # Identify the range of dates for that particular explosion
-        start_date = explosion_row['event_date'] - pd.DateOffset(days = 21)
-        end_date = explosion_row['event_date'] + pd.DateOffset(days = 10)
-
-        # Identify all battles within the selected range
-        df_battles_within_range = df_battles_only[(df_battles_only['event_date'] > start_date) 
-                                                  & (df_battles_only['event_date'] < end_date)]
-
-        # Iterate through every battle in the given timeframe
-        for _,battle_row in df_battles_within_range.iterrows():
-
-            # Retrieve battle location
-            battle_loc = (battle_row['latitude'],battle_row['longitude'])
-            
-            # Compute distance between battle location and explosion
-            if geopy.distance.geodesic(explosion_loc, battle_loc).km < 100:
-                
-                # If distance is less than 100km, mark as a battle explosion and break
-                battle_explosion=True
-                break
-
-        # If it is not a battle explosion, append data_id to a list
-        if not battle_explosion:
-            civilian_explosion_ids.append(explosion_row['data_id'])
-
+    # An explosion is a civilian explosion if no battle happened within 100km
+    # in the 21 days before or the 10 days after it.
+    # Battles are looked up in a spatio-temporal index instead of checking every pair,
+    # by precompute.py (see pipeline.py)
+    civilian_explosion_ids = get_artifact('civilian_explosions')['data_id']
 
     # Filter out explosions based on data_id's tagged as non battle explosions
     civ_explosions = df_battle_subset[df_battle_subset['data_id'].isin(civilian_explosion_ids)].copy()
 
-    # Save to csv
-    civ_explosions.to_csv(r'./Data/civ_explosions.csv')
-
     # Return computed value
     return civ_explosions
 
 
 @st.cache_data()
 def get_civilian_explosions():
-    civ_explosions=None
-    if is_running_on_streamlit():
-        try:
-            civ_explosions=pd.read_csv(r'./Data/civ_explosions.csv')
-        except:
-            civ_explosions=calculate_update_civ_explosions()
-    else:
-        civ_explosions=calculate_update_civ_explosions()
-    return civ_explosions
+    return calculate_update_civ_explosions()
 
 civ_explosions = get_civilian_explosions()
 
@@ -319,47 +313,30 @@ st.subheader("Plotting non-battle (remote) attacks")
 
 st.write('Number of non battle explosions:', len(civ_explosions))
 
-# Create a column 
-civ_explosions['event_date'] = pd.to_datetime(civ_explosions['event_date'])
-civ_explosions['year_month'] = civ_explosions['event_date'].map(lambda x : x.month_name() + ', '+ str(x.year))
+# The month_year label column is computed when the battle data is loaded
 civ_explosions.sort_values(by='event_date',inplace=True)
 
 # Group remote explosions by month and year
-grouped = civ_explosions.groupby(by=['year_month']).agg({'data_id':'count','event_date':'min'})[['data_id','event_date']]
+grouped = civ_explosions.groupby(by=['month_year'], observed=True).agg({'data_id':'count','event_date':'min'})[['data_id','event_date']]
 
 # Reset index to get month as a column
 grouped.reset_index(inplace=True)
 
-# Create the base map (has different dimensions and centering from the one in get_base_Ukraine_Map())
-base = alt.Chart(alt.Data(values=ukraine_map)).mark_geoshape(
-      stroke='black',
-      strokeWidth=0.5
-  ).encode(
-      color=alt.value('#f5f5f5'),
-  ).project(
-      type='mercator',
-      scale=1100,
-      center=[31, 55] 
-  ).properties(
-      width=500,
-      height=400,
-      title="Remote explosions by month"
-  )
+# Create the base map (has different dimensions and centering from the other maps)
+base = get_base_Ukraine_map("Remote explosions by month", center=[31, 55], width=500, height=400)
 
 # Define the selector that enables chart interactivity
 select_month = alt.selection_single(encodings=['x'])
 
-# Get all points to plot
-circle_points = alt.Chart(civ_explosions).mark_circle(
+# Get all points to plot, counted per hexagon and month when there are too many
+circle_points = charts.event_chart(civ_explosions, by=['month_year'], tooltip=['location:N','event_type:O'],
+                                   keep=['event_date']).mark_circle(
     opacity=0.8,
     stroke='black',
     strokeWidth=1,
 ).encode(
-    latitude='latitude:Q',
-    longitude='longitude:Q',
-    tooltip=['location:N','event_type:O'],
     color=alt.condition(select_month,
-                        alt.Color('year_month:O', scale=alt.Scale(scheme='dark2'),sort=['event_date']),
+                        alt.Color('month_year:O', scale=alt.Scale(scheme='dark2'),sort=['event_date']),
                         alt.value('lightgray')),
     opacity = alt.condition(select_month, 
                             alt.value(1.0), 
@@ -376,7 +353,7 @@ map = alt.layer(base,circle_points,kyiv)
 # Create the bar graph that shows counts of explosions by month
 bar_slider = alt.Chart(grouped).mark_bar().encode(
     x={
-        'field':'year_month',
+        'field':'month_year',
        'sort':{'field':'event_date'},
        'title':'Month'
        },
@@ -407,15 +384,17 @@ st.markdown('For further analysis, we started by plotting the points of all the
 start_date = datetime.date(2022, 10, 15)
 end_date = datetime.date(2022, 10, 15)
 dates = [start_date + datetime.timedelta(days=x) for x in range(0, 1)]
-df_battles_only['event_date'] = pd.to_datetime(df_battles_only['event_date'])
 
 #create the dataframe
-df_battle_subset_Nov1 = df_battles_only[df_battles_only['event_date'].isin(dates)]
+df_battle_subset_Nov1 = df_battles_only[df_battles_only['day_of_war'].isin(loaders.day_of_war(dates))]
 
 # Create the base map
 base = get_base_Ukraine_map("Battles on October 15th, 2022")
 
-circle_points = alt.Chart(df_battle_subset_Nov1).mark_circle(
+# Columns used by the points and the line, shared by both charts
+points_Nov1 = charts.encoded(df_battle_subset_Nov1, 'latitude', 'longitude', 'location', 'event_type', 'sub_event_type')
+
+circle_points = alt.Chart(points_Nov1).mark_circle(
     opacity=0.8,
     stroke='black',
     strokeWidth=1,
@@ -443,7 +422,7 @@ st.subheader("Establishing the line of battle")
 
 st.markdown("We then drew a line connecting all points on the battlefield.")
 
-line = alt.Chart(df_battle_subset_Nov1).mark_line(
+line = alt.Chart(points_Nov1).mark_line(
     opacity=0.8,
     stroke='red',
     strokeWidth=3,
@@ -475,11 +454,8 @@ st.markdown('''Next, we aggregated the battles *by month*, and repeated the two
 \n1) Plotted all the battles
 2) Drew a line that connected all the battles\n''')
 
-start_date = datetime.date(2022, 3, 7)
-end_date = datetime.date(2023, 1, 7)
-
-dates = [start_date + datetime.timedelta(days=x*30) for x in range(0, 11)]
-df_battles_only['event_date'] = pd.to_datetime(df_battles_only['event_date'])
+# One day every 30 days, from March 7th 2022 to January 7th 2023
+dates = pipeline.MONTHLY_DATES
 
 def create_line_list(battles_df, dates_list):
     '''
@@ -488,21 +464,21 @@ def create_line_list(battles_df, dates_list):
       create_line_list(df0)-->  [line1, line2, line 3 ]
     '''
 
-    df_battle_subset= df_battles_only[df_battles_only['event_date'].isin(dates)]
+    df_battle_subset= df_battles_only[df_battles_only['day_of_war'].isin(loaders.day_of_war(dates))]
     pass
 
 # create the dataframe
-df_battle_subset_by_month = df_battles_only[df_battles_only['event_date'].isin(dates)].copy()
-
-# Create a columm to read month easier
-df_battle_subset_by_month['month_year'] = df_battle_subset_by_month['event_date'].map(
-    lambda x : x.month_name() + ', ' + str(x.year))
+df_battle_subset_by_month = pipeline.monthly_battles(df_battles_only)
 
 # Create the base map
 base = get_base_Ukraine_map("Battle Lines By Month")
 
+# Columns used by the points and the lines, shared by both charts
+points_by_month = charts.encoded(df_battle_subset_by_month, 'latitude', 'longitude', 'location', 'sub_event_type',
+                                 'event_date', 'month_year')
+
 # Mark all the battle points
-circle_points = alt.Chart(df_battle_subset_by_month).mark_circle(
+circle_points = alt.Chart(points_by_month).mark_circle(
     opacity=1,
     stroke='black',
     strokeWidth=1,
@@ -517,7 +493,7 @@ circle_points = alt.Chart(df_battle_subset_by_month).mark_circle(
     center=[31, 49])
 
 # Mark the line connecting all the points
-line_total = alt.Chart(df_battle_subset_by_month).mark_line(
+line_total = alt.Chart(points_by_month).mark_line(
     opacity=0.6,
     strokeWidth=2,
 ).encode(
@@ -545,230 +521,52 @@ st.altair_chart(map.configure_legend(labelLimit=0))
 
 st.markdown("**Figure 6:** The map above shows all the battle points and lines, plotted by month. The points are sub-categorized into Armed Clashes, Government (Ukraine) regains territory and Non - state (Russia) actor overtakes territory. All these events are connected monthwise by a line. This displays the line of battle by month.")
 
-st.markdown("Clearly, we need to separate the two fronts of battle since the lines are 'zig-zagging' and join the points based on longitude for the Northern Front and latitude for the Eastern front.")
+st.markdown("Clearly, we need to separate the two fronts of battle since the lines are 'zig-zagging'. Rather than splitting the map with fixed latitude/longitude boxes, which leave out the battles in between (e.g. around Kherson), the fronts are found in the battle data: the battles of every week are clustered by density, the clusters are followed from day to day, and every front found this way belongs to the Northern or the Eastern front, whichever chain of the locations below is nearer. The Eastern front goes round the south from Odesa, so it includes the southern battles.")
 
 st.markdown('From online sources, we identify important battle locations on both fronts and retrieve their latitude and longitude from Google searches.')
 
 st.code('''
-    # East Battle Points 
-    odessa = shapely.geometry.Point(46.47747, 30.73262) 
-    sevastopol = shapely.geometry.Point(44.58883, 33.5224)
-    kerch = shapely.geometry.Point(45.3607, 36.4706)
-    mariupol = shapely.geometry.Point(47.09514, 37.54131) 
-    luhansk = shapely.geometry.Point(48.56705, 39.31706) 
-    vovchansk = shapely.geometry.Point(50.29078, 36.94108)
+    # East Battle Points (longitude, latitude)
+    odessa = (30.73262, 46.47747)
+    sevastopol = (33.5224, 44.58883)
+    kerch = (36.4706, 45.3607)
+    mariupol = (37.54131, 47.09514)
+    luhansk = (39.31706, 48.56705)
+    vovchansk = (36.94108, 50.29078)
     \n
-    # North Battle Points
-    dobryanka = shapely.geometry.Point(52.0601, 31.1837)
-    seredyna = shapely.geometry.Point(52.1837, 34.0412)
-    hremyach = shapely.geometry.Point(52.3332, 33.2891)'''
+    # North Battle Points (longitude, latitude)
+    dobryanka = (31.1837, 52.0601)
+    seredyna = (34.0412, 52.1837)
+    hremyach = (33.2891, 52.3332)'''
 )
 
 st.markdown('''Next, we define the following functions:
- \n1) **create_line(date, df)** : Creates a line for a particular date in the dataframe
+ \n1) **DailyFronts(df).ordered_lines()** : Creates the battle line of every day. The battle locations of the day are connected by their shortest network (the minimum spanning tree of their Delaunay triangulation), and the line follows the longest path through it, so it runs along the front instead of zig-zagging between the battles in the order of the data. A day with a single battle location keeps the line of the day before
 \n2) **create_east_polygon(line)** : Creates and returns a polygon for the *Eastern* front based on the line parameter
 \n3) **create_north_polygon(line)** : Creates and returns a polygon for the *Northern* front based on the line parameter
-\n4) **caclulate_area_diff(polygon1, polygon2)** : Calculates and returns the difference in area between the 2 polygons''')
-
-def create_line(battle_date, battles_df):
-    '''
-      This function takes in a date and a  dataframe and creates a line for that date.
-      create_geo_pandas_line(date, battles_df) -->  [line1, line2, line 3 ]
-    '''
-
-    # Create a GeoDataFrame of the points
-    date_df = battles_df[battles_df['event_date'].isin([battle_date])]
-    date_df = date_df[['latitude', 'longitude']]
-    line = shapely.geometry.LineString(list(zip(date_df.longitude, date_df.latitude)))
-    return line
-
-def create_east_polygon(line):
-    '''
-      This function takes a line and creates a polygon for the eastern part of the front
-      create_east_polygon(line) -->  \
-      POLYGON ((37.9999 48.5956, 46.47747 30.73262, 44.58883 33.5224, 45.3607 36.4706, 47.09514 37.54131, ...))
-    '''
-    # Point gotten from https://latitudelongitude.org/ua/odessa/
-    odessa = shapely.geometry.Point(46.47747, 30.73262) 
-    
-    # Point gotten from https://latitudelongitude.org/ua/sevastopol/
-    sevastopol = shapely.geometry.Point(44.58883, 33.5224)
-    
-    # Point gotten from https://latitudelongitude.org/ua/kerch/
-    kerch = shapely.geometry.Point(45.3607, 36.4706)
-    
-    # Point gotten from https://latitudelongitude.org/ua/mariupol/    
-    mariupol = shapely.geometry.Point(47.09514, 37.54131) 
-    
-    # Point gotten from https://latitudelongitude.org/ua/luhansk/
-    luhansk = shapely.geometry.Point(48.56705, 39.31706) 
-    
-    # Point gotten from https://latitudelongitude.org/ua/vovchansk/
-    vovchansk = shapely.geometry.Point(50.29078, 36.94108)
-    
-    
-    polygon_points = [list(line.coords)[i] for i in range(0, len(line.coords))]
-    polygon_points.append(list(odessa.coords)[0])
-    polygon_points.append(list(sevastopol.coords)[0])
-    polygon_points.append(list(kerch.coords)[0])
-    polygon_points.append(list(mariupol.coords)[0])
-    polygon_points.append(list(luhansk.coords)[0])
-    polygon_points.append(list(vovchansk.coords)[0])
-    polygon = shapely.geometry.polygon.Polygon(polygon_points)
-    
-    return polygon
-
-
-def create_north_polygon(line):
-    '''
-      This function takes a line and creates a polygon for the northern part of the front
-      create_north_polygon(line) -->  
-        POLYGON ((37.9999 48.5956, 46.47747 30.73262, 44.58883 33.5224, 45.3607 36.4706, 47.09514 37.54131, ...))
-    '''
-    
-    # Point gotten from 
-    # https://www.google.com/search?q=dobryanka+ukraine+longitude+and+latitude&ei=VmRoZMb9KZ6j5NoPwMC7eA&oq=dobryanka+ukraine+longitude&gs_lcp=Cgxnd3Mtd2l6LXNlcnAQAxgAMgUIIRCgATIFCCEQoAEyBQghEKABOgsIABCKBRCGAxCwA0oECEEYAVCTCVjTI2D3KmgBcAB4AIABgAGIAdAHkgEEMTIuMZgBAKABAcgBA8ABAQ&sclient=gws-wiz-serp
-    dobryanka = shapely.geometry.Point(52.0601, 31.1837)
-    
-    # Point from 
-    # https://www.google.com/search?q=seredyna+ukraine+longitude+and+latitude&ei=X2RoZInAG6Gm5NoP59uvwA4&ved=0ahUKEwjJ68WsnoP_AhUhE1kFHeftC-gQ4dUDCBE&uact=5&oq=seredyna+ukraine+longitude+and+latitude&gs_lcp=Cgxnd3Mtd2l6LXNlcnAQAzIFCAAQogQyBQgAEKIEMgUIABCiBDIFCAAQogQ6CwgAEIoFEIYDELADOgoIIRCgARDDBBAKSgQIQRgBUOMPWIoVYJIWaARwAHgAgAFfiAGvAZIBATKYAQCgAQKgAQHIAQLAAQE&sclient=gws-wiz-serp
-    seredyna = shapely.geometry.Point(52.1837, 34.0412)
-    
-    # Point from
-    # https://www.google.com/search?q=hremyach+ukraine+longitude+and+latitude&ei=mWRoZLeXLb-o5NoP892EsAU&ved=0ahUKEwj3x6vInoP_AhU_FFkFHfMuAVYQ4dUDCBE&uact=5&oq=hremyach+ukraine+longitude+and+latitude&gs_lcp=Cgxnd3Mtd2l6LXNlcnAQAzIFCAAQogQyBQgAEKIEOggIABCiBBCwAzoICCEQoAEQwwRKBAhBGAFQ4AJY_gZg5ApoAnAAeACAAWGIAcEBkgEBMpgBAKABAqABAcgBAsABAQ&sclient=gws-wiz-serp
-    hremyach = shapely.geometry.Point(52.3332, 33.2891)
-    
-    
-    polygon_points = [list(line.coords)[i] for i in range(0, len(line.coords))]
-    polygon_points.append(list(dobryanka.coords)[0])
-    polygon_points.append(list(hremyach.coords)[0])
-    polygon_points.append(list(seredyna.coords)[0])
-    polygon = shapely.geometry.polygon.Polygon(polygon_points)
-    return polygon
-
-def calculate_area_diff(polygon1, polygon2):
-    '''
-    This function calculate the area difference from one polygon from another
-    calculate_area_diff(polygon1, polygon2) --> 4.9627030048339
-    '''
-    diff_1 = polygon1.buffer(.01) - polygon2.buffer(.01)
-    diff_2 = polygon2.buffer(.01) - polygon1.buffer(.01)
-    
-    return diff_1.area + diff_2.area
-
-
-
-
-
-# Seperate the northern front of the war from the eastern/southern fronts of the war
-df_northern_front = df_battles_only[(df_battles_only['latitude'] >= 50.2826) 
-                                    & (df_battles_only['longitude'] <= 35.0364)]
-
-df_eastern_front = df_battles_only[(df_battles_only['latitude'] < 50.2826) 
-                                   & (df_battles_only['longitude'] > 35.0364)]
-
-# Gather all the dates for both fronts
-battle_dates_north = df_northern_front['event_date'].unique()
-battle_dates_east = df_eastern_front['event_date'].unique()
-
-# Seperate/sort battle dates for the north
-battle_dates_north = battle_dates_north[battle_dates_north < pd.to_datetime('04-07-22')]
-
-# To CHECK CHECK
-# st.write(battle_dates_north)
-# battle_dates_north.sort()
-
-# Create a list of the dataframes for each days worth of battles
-battles_north = [df_northern_front[df_northern_front['event_date'].isin([battle_date])] 
-                 for battle_date in battle_dates_north]
-battles_east = [df_eastern_front[df_eastern_front['event_date'].isin([battle_date])] 
-                for battle_date in battle_dates_east]
-
-# Create a mechanism of identifying if the battles were a net gain or loss for the Ukrainians
-max_lat_north = [battles_north[x]['latitude'].max() for x in range(len(battles_north))]
-max_long_east = [battles_east[x]['longitude'].max() for x in range(len(battles_east))]
-df_north_dir_vic = [0]
-df_east_dir_vic = [0]
-
-# If its a net positive for the Ukrainians i.e. the line moves East or North give it a 1 else -1
-df_north_dir_vic += [-1 if max_lat_north[x] > max_lat_north[x-1] else 1 for x in range(1, len(battles_north))]
-df_east_dir_vic += [1 if max_long_east[x] < max_long_east[x-1] else -1 for x in range(1, len(battles_east))]
-
-# Create a list of the battle lines
-battle_lines_north = [create_line(battle_dates_north[x], battles_north[x]) 
-                      if len(battles_north[x]) > 1 
-                      else create_line(battle_dates_north[x-1], battles_north[x-1]) for x in range(len(battles_north))]
-battle_lines_east = [create_line(battle_dates_east[x], battles_east[x]) 
-                     if len(battles_east[x]) > 1 
-                     else create_line(battle_dates_east[x-1], battles_east[x-1]) for x in range(len(battles_east))]
-
-# Create a a list of the polygons
-battle_polygons_north = [create_north_polygon(line) for line in battle_lines_north]
-battle_polygons_east = [create_east_polygon(line) for line in battle_lines_east]
-
-# Calculate the difference from one day to the next
-battle_difference_north =  [calculate_area_diff(battle_polygons_north[x], battle_polygons_north[x-1])  
-                            if x > 0 else 0 for x in range(len(battle_polygons_north))]
-battle_difference_east =  [calculate_area_diff(battle_polygons_east[x], battle_polygons_east[x-1])  
-                           if x > 0 else 0 for x in range(len(battle_polygons_east))]
-
-# Calcualte the difference again but include if it was the Ukrainians or Russians
-battle_difference_north_dir =  [calculate_area_diff(battle_polygons_north[x], 
-                                                    battle_polygons_north[x-1])*df_north_dir_vic[x]  
-                                if x > 0 else 0 for x in range(len(battle_polygons_north))]
-battle_difference_east_dir =  [calculate_area_diff(battle_polygons_east[x], 
-                                                   battle_polygons_east[x-1])*df_east_dir_vic[x]  
-                               if x > 0 else 0 for x in range(len(battle_polygons_east))]
-
-# Calculate the total difference
-battle_diff_north_tot = [sum(battle_difference_north_dir[:i+1]) for i in range(len(battle_difference_north_dir))]
-battle_diff_east_tot = [sum(battle_difference_east_dir[:i+1]) for i in range(len(battle_difference_east_dir))]
+\n4) **caclulate_area_diff(polygon1, polygon2)** : Calculates and returns the difference in area between the 2 polygons
+\nThe polygons are projected to an equal-area projection (EPSG:3035) so that the differences are measured in sq. km.''')
 
+# Seperate the northern front of the war from the eastern/southern fronts of the war (found in the battle data),
+# group the battles of both fronts by day,
+# create the battle lines and their polygons, projected to an equal-area CRS so areas are in km²,
+# and calculate the difference from one day to the next once, along with the difference signed by
+# whether it was the Ukrainians or Russians who gained and the running total.
+# This is done offline by precompute.py, see pipeline.daily_front_movement
+front_movement = get_artifact('daily_front_movement')
 
+# Columns used by Figures 7 and 8, shared by both charts
+front_movement_chart = charts.encoded(front_movement, 'date', 'front', 'conquered_difference', 'signed_difference')
 
 st.markdown("After doing the required transformations, we plot the daywise difference in battle lines.")
 
-# Compute differences on the eastern front and compute a zone column for the altair chart legend
-diff_df = pd.DataFrame(
-    {'date':battle_dates_east, 
-     'conquered_difference':battle_difference_east , 
-     'zone' : ['East' for i in range(len(battle_difference_east))]
-    })
-
-
-# Create chart for area differences on the eastern front
-chart = alt.Chart(diff_df).mark_line(point=True).encode(
-    x='date',
-    y='conquered_difference',
-    color='zone',
-    tooltip=['date', alt.Tooltip('conquered_difference:Q', format='.3f', title='Difference (km²)')]
-).properties(
-    width=875,
-    height=500,
-    title='Area Diffference (in sq. km) by Day Eastern Front'
-)
-
-# Compute differences on the northern front and compute a zone column for the altair chart legend
-diff_df_n = pd.DataFrame(
-    {'date':battle_dates_north, 'conquered_difference':battle_difference_north, 
-     'zone' : ['North' for i in range(len(battle_difference_north))]
-    })
-
-# Create chart for area differences on the northern front
-chart2 = alt.Chart(diff_df_n).mark_line(point=True).encode(
+# Create chart for area differences on both fronts
+c = alt.Chart(front_movement_chart).mark_line(point=True).encode(
     x='date',
     y='conquered_difference',
-    color='zone',
+    color=alt.Color('front', title='zone'),
     tooltip=['date', alt.Tooltip('conquered_difference:Q', format='.3f', title='Difference (km²)')]
 ).properties(
-    width=875,
-    height=500,
-    title='Area Diffference (in sq. km) by Day Northern Front'
-)
-
-# Layer the chart
-c = alt.layer(
-    chart,chart2).properties(
     width=875,
     height=500,
     title='Area Difference (in sq. km) by Day Both Fronts'
@@ -780,36 +578,21 @@ st.markdown('''**Figure 7**: The chart above shows the amount of area (in sq. km
 It is clearly visible that the Northern territory was quickly regained by the Ukrainians. The difference on the Northern front is more than the Eastern front, even on the earlier days of the war.
 The eastern front, over almost 11 months has very little difference in area, showing that the eastern front of the Russian attack has also remained pretty much stagnant / confined to a smaller area.''')
 
-diff_df = pd.DataFrame({'date':battle_dates_east, 'conquered_difference':battle_difference_east_dir, 'Front' : ['East' for i in range(len(battle_difference_east))]})
-
-chart = alt.Chart(diff_df).mark_line(point=True).encode(
+chart = alt.Chart(front_movement_chart).mark_line(point=True).encode(
     x='date',
-    y='conquered_difference',
-    color='Front',
-    tooltip=['date', alt.Tooltip('conquered_difference:Q', format='.3f', title='Difference (km²)')]
-).properties(
-    width=840,
-    height=500,
-    title='Area Difference by Day Eastern Front'
-)
-
-diff_df_n = pd.DataFrame({'date':battle_dates_north, 'conquered_difference':battle_difference_north_dir, 'Front' : ['North' for i in range(len(battle_difference_north))]})
-
-chart2 = alt.Chart(diff_df_n).mark_line(point=True).encode(
-    x='date',
-    y='conquered_difference',
-    color='Front',
-    tooltip=['date', alt.Tooltip('conquered_difference:Q', format='.3f', title='Difference (km²)')]
+    y=alt.Y('signed_difference', title='conquered_difference'),
+    color=alt.Color('front', title='Front'),
+    tooltip=['date', alt.Tooltip('signed_difference:Q', format='.3f', title='Difference (km²)')]
 ).properties(
     width=840,
     height=500,
-    title='Area Difference by Day Northern Front'
+    title='Area Difference by Day Both Fronts'
 )
 
 zero_line = alt.Chart(pd.DataFrame({'y': [0]})).mark_rule(color='red',size=2,opacity=0.5).encode(y='y')
 
 map = alt.layer(
-    chart,chart2,zero_line).properties(
+    chart,zero_line).properties(
     width=840,
     height=500,
     title='Area Difference by Day Both Fronts'
@@ -822,85 +605,56 @@ From this, we can identify that the Northern front had fierce battles initially,
 The eastern front, over almost 11 months has very little difference in area, showing that the eastern front of the Russian attack has also remained pretty much stagnant / confined to an area. The line chart oscillates around 0, and shows that no side has been able to move too much, although Russia has been able to push into Ukraine a little.
 ''')
 
-st.subheader("Plotting Battle lines by month")
-
-st.markdown("Next, we aggregate the battle line movement by month, for each front of the battle.")
-st.markdown("As we identified before, we make separate lines for East and Northern fronts and connect them separately using latitude and longitude respectively.")
-
-# Create a copy of the battle dataset
-df_battle_subset_by_month_copy = df_battle_subset_by_month.copy()
-
-# Create a column for legend readability
-df_battle_subset_by_month_copy['month_year'] = df_battle_subset_by_month_copy['event_date'].map(
-    lambda x : str(x.month_name())+', '+str(x.year))
-
-# Create a column for identifying if the battle was the northern front or not
-
-# Create a column for identifying if the battle was the northern front or not
-df_battle_subset_by_month_copy['northern_front'] = np.where(
-    (df_battle_subset_by_month_copy['latitude'] >= 50.20) 
-    & (df_battle_subset_by_month_copy['longitude'] <= 35.0364), 
-    1, 0)
+st.subheader("Fronts found in the battle data")
 
-# Create battle lines, identify area gained or lost and assign a sign for the computed area difference (+ve for Ukrane and -ve for Russia).
-
-# Gather all the dates for both fronts
-battle_dates_month = df_battle_subset_by_month_copy['event_date'].unique()
-
-# Create a list of the dataframes for each days worth of battles
-battles_month = [df_battle_subset_by_month_copy[
-    df_battle_subset_by_month_copy['event_date'].isin([battle_date])] for battle_date in battle_dates_month]
+st.markdown('''The two fronts above are made of the fronts found in the battle data: the battles of every week are
+clustered by density (DBSCAN on the distance between battles), and every cluster is followed from one day to the next.
+The map below shows the path of the centre of every front found this way, over the whole war.''')
 
-# Create a mechanism of identifying if the battles were a net gain or loss for the Ukrainians
-max_long_month = [battles_month[x]['longitude'].max() for x in range(len(battles_month))]
-df_month_dir_vic = [0]
+# Fronts discovered offline by precompute.py, see pipeline.front_segments
+front_segments = get_artifact('front_segments')
 
-# If its a net positive for the Ukrainians ie the line moves East or North give it a 1 o/w -1
-df_month_dir_vic += [1 if max_long_month[x] < max_long_month[x-1] else -1 for x in range(1, len(battles_month))]
+base = get_base_Ukraine_map("Centres of the fronts found in the battle data")
 
-# Create a list of the battle lines
-battle_lines_month = [create_line(battle_dates_month[x], battles_month[x]) if len(battles_month[x]) > 1 
-                      else create_line(battle_dates_month[x-1], battles_month[x-1]) 
-                      for x in range(len(battles_month))]
-
-# Create a a list of the polygons
-battle_polygons_month = [create_east_polygon(line) for line in battle_lines_month]
+front_paths = alt.Chart(front_segments).mark_line(point=True, opacity=0.8).encode(
+    latitude='latitude:Q',
+    longitude='longitude:Q',
+    order='date:T',
+    color=alt.Color('front:N', title='Front'),
+    tooltip=['front:N', alt.Tooltip('date:T', title='Date'), alt.Tooltip('battles:Q', title='Battles that day')],
+).project(
+    type='mercator',
+    scale=1100,
+    center=[31, 49]
+)
 
-# Calculate the difference from one day to the next
-battle_difference_month =  [calculate_area_diff(battle_polygons_month[x], 
-                                                battle_polygons_month[x-1])*df_month_dir_vic[x]  
-                            if x > 0 else 0 
-                            for x in range(len(battle_polygons_month))]
+st.altair_chart(alt.layer(base, front_paths).configure_legend(labelLimit=0))
 
-# Store a dataframe to identify dates, zones and the difference monthwise.
+st.subheader("Plotting Battle lines by month")
 
-# Create a dataframe for the Eastern front, aggregated by month
-diff_df_month = pd.DataFrame(
-    {'date':battle_dates_month, 
-     'conquered_difference':battle_difference_month, 
-     'zone' : ['East' for i in range(len(battle_difference_month))]
-     })
+st.markdown("Next, we aggregate the battle line movement by month, for each front of the battle.")
+st.markdown("As we identified before, we make separate lines for East and Northern fronts. Instead of joining the points by latitude or longitude, the points of every month are joined in their order along the front: the longest path through the shortest network connecting them (their minimum spanning tree). The battles off that path, behind the front, are left out of the line.")
 
-# Group the data monthly.
+# Create a copy of the battle dataset
+df_battle_subset_by_month_copy = df_battle_subset_by_month.copy()
 
-# Group by formatted date
-diff_df_month_grouped = diff_df_month.groupby(diff_df_month.date.dt.strftime('%B, %Y')
-                                             )['conquered_difference'].sum().reset_index()
+# The month_year (legend) and front columns are added when the battle data is loaded
 
-# get absolute value of calculated difference
-diff_df_month_grouped['conquered_difference'] = diff_df_month_grouped['conquered_difference'].abs()
+# Create battle lines, identify area gained or lost and assign a sign for the computed area difference (+ve for Ukrane and -ve for Russia).
+# The absolute difference is summed by month offline by precompute.py, see pipeline.monthly_front_movement
+diff_df_month_grouped = get_artifact('monthly_front_movement')
 
 
 # Join with the battle dataset after obtaining month wise gain/loss value
 df_battle_subset_by_month_copy = df_battle_subset_by_month_copy.merge(
     diff_df_month_grouped,
     how='left',
-    left_on='month_year',
+    left_on=df_battle_subset_by_month_copy['month_year'].astype(str),
     right_on='date')
 
 # Create 2 sub-dataframes
-df_east = df_battle_subset_by_month_copy[df_battle_subset_by_month_copy['northern_front'] == 0]
-df_north = df_battle_subset_by_month_copy[df_battle_subset_by_month_copy['northern_front']==1]
+df_east = df_battle_subset_by_month_copy[df_battle_subset_by_month_copy['front'] == 'East']
+df_north = df_battle_subset_by_month_copy[df_battle_subset_by_month_copy['front'] == 'North']
 
 # Get the minimum and maximum of conquered difference for each of the fronts for altair plotting
 east_max, east_min = df_east['conquered_difference'].max(),df_east['conquered_difference'].min()
@@ -912,15 +666,30 @@ north_max, north_min = df_north['conquered_difference'].max(),df_north['conquere
 selection = alt.selection_single(fields=['month_year'], bind='legend')
 selection_n = alt.selection_single(fields=['month_year'], bind='legend')
 
+# Order the points of every monthly line along its front, see fronts.DailyFronts.spines
+# (the battles in no front found are left out)
+east = (df_battle_subset_by_month_copy['front'] == 'East').to_numpy()
+north = (df_battle_subset_by_month_copy['front'] == 'North').to_numpy()
+position_on_front = np.full(len(df_battle_subset_by_month_copy), np.nan)
+position_on_front[east] = fronts.DailyFronts(df_battle_subset_by_month_copy[east]).positions(end=fronts.EAST_ANCHORS[0])
+position_on_front[north] = fronts.DailyFronts(df_battle_subset_by_month_copy[north]).positions(end=fronts.NORTH_ANCHORS[0])
+df_battle_subset_by_month_copy['position_on_front'] = position_on_front
+
+# Columns used by the lines of both fronts, shared by both charts (the battles on the lines only)
+lines_by_month = charts.encoded(df_battle_subset_by_month_copy.dropna(subset=['position_on_front']),
+                                'latitude', 'longitude', 'conquered_difference', 'month_year', 'event_date', 'front',
+                                'position_on_front', 'oblast')
+
 # Creating the line for the Eastern front
-line_east = alt.Chart(df_battle_subset_by_month_copy).mark_line(
+line_east = alt.Chart(lines_by_month).mark_line(
 ).encode(
-    order='latitude:O',
+    order='position_on_front:Q',
     latitude='latitude:Q',
     longitude='longitude:Q',
     strokeWidth=alt.StrokeWidth('conquered_difference:Q', 
                                 scale=alt.Scale(domain=[east_min, east_max], range=[5, 1])),
     color=alt.Color('month_year:O', scale=alt.Scale(scheme='goldred'),sort=['event_date']),
+    tooltip=['month_year:O', alt.Tooltip('oblast:N', title='Oblast')],
     opacity=alt.condition(selection, alt.value(1), alt.value(0))
 ).project(
     type='mercator',
@@ -929,16 +698,17 @@ line_east = alt.Chart(df_battle_subset_by_month_copy).mark_line(
 ).properties(
     width=700,
     height=500,
-).add_selection(selection).transform_filter(alt.datum.northern_front == 0)
+).add_selection(selection).transform_filter(alt.datum.front == 'East')
 
 # Creating the line for the Northern front
-line_north = alt.Chart(df_battle_subset_by_month_copy).mark_line().encode(
-    order='longitude:O',
+line_north = alt.Chart(lines_by_month).mark_line().encode(
+    order='position_on_front:Q',
     latitude='latitude:Q',
     longitude='longitude:Q',
     strokeWidth=alt.StrokeWidth('conquered_difference:Q', 
                                 scale=alt.Scale(domain=[north_min, north_max], range=[5, 1])),
     color=alt.Color('month_year:O', scale=alt.Scale(scheme='goldred'),sort=['event_date']),
+    tooltip=['month_year:O', alt.Tooltip('oblast:N', title='Oblast')],
     opacity=alt.condition(selection, alt.value(1), alt.value(0))
 ).project(
     type='mercator',
@@ -947,7 +717,7 @@ line_north = alt.Chart(df_battle_subset_by_month_copy).mark_line().encode(
 ).properties(
     width=700,
     height=500,
-).add_selection(selection_n).transform_filter(alt.datum.northern_front == 1)
+).add_selection(selection_n).transform_filter(alt.datum.front == 'North')
 
 map = base + line_east
 
@@ -979,83 +749,10 @@ st.header("Equipment Losses and Casualty Data")
 
 st.markdown("The charts below identifies the losses encountered by the Russians daywise during the battle. The losses dataset contains information on tanks, field artillery, anti aircraft weapons, drones, aircrafts and personnel too.")
 
-data_path = path.joinpath('Data')
-russia_losses = data_path.joinpath('russia_losses_equipment.csv')
-russia_losses_p = data_path.joinpath('russia_losses_personnel.csv')
-battle_data = data_path.joinpath('acled_battle_data_23Feb.csv')
-
-maps = data_path.joinpath("ukraine_geojson-master")
-ukraine_map_path = maps.joinpath("UA_FULL_Ukraine.geojson")
-
-df_equipment = pd.read_csv(russia_losses, sep=',')
-df_personnel = pd.read_csv(russia_losses_p, sep=',')
-df_battle = pd.read_csv(battle_data, sep=',')
-
-
-# Define a function that takes in a dataframe to convert the data to identify day wise losses encountered by the Russians. The Kaggle dataset contains cumulative losses. We use this function to identify losses day wise.
-def convert_data(df):
-    '''
-    Convert data of the dataframe entered
-    '''
-    def convert_cumulative_to_daywise(col_name):
-        '''
-        Convert cumulative columns to daywise by subtracting i row from (i+1) row value and
-        '''
-
-        #The meaning of biufc: b bool, i int (signed), u unsigned int, f float, c complex
-        if df[col_name].dtype.kind in 'biufc':
-            return df[col_name] - df[col_name].shift()
-      
-        else:
-            return df[col_name]
-
-    return convert_cumulative_to_daywise
-
-
-# Initialize and clean the equipment data
-
-# Initializing the data transformer function to equipment dataframe
-equiment_count_transformer = convert_data(df_equipment)
-
-# Create an empty dataframe to store counts by day
-df_equipment_by_day = pd.DataFrame()
-
-#Extracting date and day columns and the columns we need to loop over to compute daywise values
-day, date, *equipment_loss_cols = df_equipment.columns
-
-# Keeping day and date column identical
-df_equipment_by_day[day] = df_equipment[day]
-df_equipment_by_day[date] = df_equipment[date]
-
-# Convert cumulative count to daywise count
-for col_name in equipment_loss_cols:
-    df_equipment_by_day[col_name] = equiment_count_transformer(col_name)
-    print('{} column processed successfully'.format(col_name))
-
-#Keeping the first row same as the original since shift sets the first row data to 0
-df_equipment_by_day.iloc[0] = df_equipment.iloc[0]
-
-# Initialize and clean the personnel data
-# Initialize data transformer function with personnel dataset
-personnel_count_transformer = convert_data(df_personnel)
-
-# Initialize an empty dataframe
-df_personnel_by_day = pd.DataFrame()
-
-#Extracting date and day columns and the columns we need to loop over to compute daywise values
-date, day, *personnel_loss_cols = df_personnel.columns
-
-# Keep day and date columm identical
-df_personnel_by_day[date] = df_personnel[date]
-df_personnel_by_day[day] = df_personnel[day]
-
-# Transform cumulative count to day wise count
-for col_name in personnel_loss_cols:
-    df_personnel_by_day[col_name] = personnel_count_transformer(col_name)
-    print('{} column processed successfully'.format(col_name))
-
-# Keeping the first row same as the original data since shift sets the first row data to 0
-df_personnel_by_day.iloc[0] = df_personnel.iloc[0]
+# The Kaggle dataset contains cumulative losses, they are converted to day wise losses
+# offline by precompute.py, see losses.daywise
+df_equipment_by_day = get_artifact('equipment_by_day')
+df_personnel_by_day = get_artifact('personnel_by_day')
 
 st.subheader("Tanks & Field Artillery")
 
@@ -1100,7 +797,7 @@ The inital spike is due to the battle being on both fronts, which were not succe
 
 st.subheader("Multi-Rocket Systems")
 
-mrs = alt.Chart(df_equipment_by_day).mark_line(point=True).encode(x= 'day', y= 'MRL').properties(
+mrs = alt.Chart(charts.encoded(df_equipment_by_day, 'day', 'MRL')).mark_line(point=True).encode(x= 'day', y= 'MRL').properties(
     height = 400 , width=850, title="Multi-Rocket Systems losses by day of war").interactive()
 mrs
 
@@ -1108,7 +805,7 @@ st.markdown("**Figure 12** : The line chart above shows the losses of Multi-Rock
 
 st.subheader("Anti-aircraft Weapons")
 
-aaw = alt.Chart(df_equipment_by_day).mark_line(point=True).encode(x= 'day', y= 'anti-aircraft warfare').properties(
+aaw = alt.Chart(charts.encoded(df_equipment_by_day, 'day', 'anti-aircraft warfare')).mark_line(point=True).encode(x= 'day', y= 'anti-aircraft warfare').properties(
     height = 400 , width=850, title="Anti-aircraft weapons losses by day of war").interactive()
 
 st.altair_chart(aaw)
@@ -1158,7 +855,7 @@ st.markdown('''**Figure 14** : The line chart above shows the losses of Drones a
 We can see as the Russian offensive failed, there has been a significant increase in drone usage for remote explosions and warfare.''')
 st.subheader("Personnel")
 
-p = alt.Chart(df_personnel_by_day).mark_line(point=True).encode(x= 'day', y= 'personnel').properties(
+p = alt.Chart(charts.encoded(df_personnel_by_day, 'day', 'personnel')).mark_line(point=True).encode(x= 'day', y= 'personnel').properties(
     height = 400 , width=850, title="Personnel losses by day of war")
 p
 
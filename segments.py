@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+import fronts
+import geodistance
+
+# Battles closer than this are neighbours in the clustering
+FRONT_EPS_KM = 40
+
+# A battle with at least this many battles within FRONT_EPS_KM (itself included) is a core battle of a front
+FRONT_MIN_SAMPLES = 4
+
+# Every day is clustered together with the battles of the days before it, so quiet days still show their fronts
+FRONT_WINDOW_DAYS = 7
+
+# A cluster continues the front of the previous days whose centre is the nearest within this distance
+FRONT_LINK_KM = 150
+
+# A front without a cluster for more than this many days has ended, a cluster appearing there later is a new front
+FRONT_MAX_GAP_DAYS = 14
+
+
+def dbscan(latitude, longitude, eps_km=FRONT_EPS_KM, min_samples=FRONT_MIN_SAMPLES):
+    '''
+      DBSCAN density clustering on the haversine distance: the cluster of every point, -1 for noise.
+      Neighbours are found with geodistance.neighbour_pairs. A point next to the core points of two clusters
+      joins the first of them. Clusters are numbered from 0 in the order of their first core point
+      dbscan(df_day['latitude'], df_day['longitude']) --> array([0, 0, 1, -1, ...])
+    '''
+    n = len(latitude)
+    i, j = geodistance.neighbour_pairs(latitude, longitude, eps_km)
+    core = np.bincount(i, minlength=n) + 1 >= min_samples
+
+    # Connected components of the core points: every point takes the smallest index it is linked to,
+    # following the links of the linked points (pointer jumping) until nothing changes
+    linked = core[i] & core[j]
+    core_i, core_j = i[linked], j[linked]
+    roots = np.arange(n)
+    while True:
+        previous = roots
+        roots = roots.copy()
+        np.minimum.at(roots, core_i, roots[core_j])
+        roots = roots[roots]
+        if np.array_equal(roots, previous):
+            break
+
+    # Border points join the cluster of a core neighbour, the other points are noise
+    labels = np.where(core, roots, n)
+    border = ~core[i] & core[j]
+    np.minimum.at(labels, i[border], roots[j[border]])
+    clustered = labels < n
+    result = np.full(n, -1, dtype=np.int64)
+    result[clustered] = np.unique(labels[clustered], return_inverse=True)[1]
+    return result
+
+
+def _link(latitude, longitude, track_latitude, track_longitude, link_km):
+    # Front of every cluster: the tracks are taken by the closest clusters first, -1 for a new front
+    fronts = np.full(len(latitude), -1, dtype=np.int64)
+    if len(track_latitude) == 0:
+        return fronts
+
+    distance = geodistance.haversine_km(latitude[:, None], longitude[:, None],
+                                        track_latitude[None, :], track_longitude[None, :])
+    taken = np.zeros(len(track_latitude), dtype=bool)
+    for cluster, track in zip(*np.unravel_index(np.argsort(distance, axis=None), distance.shape)):
+        if distance[cluster, track] >= link_km:
+            break
+        if fronts[cluster] == -1 and not taken[track]:
+            fronts[cluster] = track
+            taken[track] = True
+    return fronts
+
+
+def segment_fronts(battles_df, eps_km=FRONT_EPS_KM, min_samples=FRONT_MIN_SAMPLES, window_days=FRONT_WINDOW_DAYS,
+                   link_km=FRONT_LINK_KM, max_gap_days=FRONT_MAX_GAP_DAYS):
+    '''
+      Discover the fronts in the battle data instead of splitting it with fixed boxes.
+      The battles of every day, with the battles of the window_days - 1 days before it, are clustered with dbscan.
+      Every cluster continues the front of the previous days with the nearest centre within link_km
+      (a front seen in the last max_gap_days days), or starts a new front.
+      Returns the front of every battle, from the clustering of its own day (-1 if it is in no cluster),
+      and the centre and number of battles of every front on every day
+      segment_fronts(df_battles_only) --> (array([0, 0, 2, -1, ...]), DataFrame (date, front, battles, ...))
+    '''
+    latitude = battles_df['latitude'].to_numpy(dtype=np.float64)
+    longitude = battles_df['longitude'].to_numpy(dtype=np.float64)
+    days = pd.to_datetime(battles_df['event_date']).to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+    # Battles sorted by day, so a window of days is a contiguous slice
+    order = np.argsort(days, kind='stable')
+    sorted_days = days[order]
+
+    battle_fronts = np.full(len(battles_df), -1, dtype=np.int64)
+    track_latitude, track_longitude, track_last_day = np.array([]), np.array([]), np.array([], dtype=np.int64)
+    rows = []
+
+    for day in np.unique(sorted_days):
+        lo = np.searchsorted(sorted_days, day - window_days + 1, 'left')
+        hi = np.searchsorted(sorted_days, day, 'right')
+        window = order[lo:hi]
+        labels = dbscan(latitude[window], longitude[window], eps_km, min_samples)
+        clusters = labels.max() + 1
+        if clusters == 0:
+            continue
+
+        # Centres of the clusters (the fronts are small enough to average degrees)
+        clustered = labels >= 0
+        size = np.bincount(labels[clustered], minlength=clusters)
+        centre_latitude = np.bincount(labels[clustered], weights=latitude[window][clustered]) / size
+        centre_longitude = np.bincount(labels[clustered], weights=longitude[window][clustered]) / size
+
+        # Continue the recent fronts, start new ones for the other clusters
+        recent = np.flatnonzero(day - track_last_day <= max_gap_days)
+        fronts = _link(centre_latitude, centre_longitude, track_latitude[recent], track_longitude[recent], link_km)
+        linked = fronts >= 0
+        fronts[linked] = recent[fronts[linked]]
+        fronts[~linked] = len(track_latitude) + np.arange((~linked).sum())
+
+        track_latitude = np.concatenate([track_latitude, np.zeros((~linked).sum())])
+        track_longitude = np.concatenate([track_longitude, np.zeros((~linked).sum())])
+        track_last_day = np.concatenate([track_last_day, np.zeros((~linked).sum(), dtype=np.int64)])
+        track_latitude[fronts], track_longitude[fronts], track_last_day[fronts] = centre_latitude, centre_longitude, day
+
+        # The battles of the day itself get the front of their cluster
+        today = (sorted_days[lo:hi] == day) & clustered
+        battle_fronts[window[today]] = fronts[labels[today]]
+
+        rows.append(pd.DataFrame({
+            'date': pd.Timestamp(np.datetime64(int(day), 'D')),
+            'front': fronts,
+            'battles': np.bincount(labels[today], minlength=clusters),
+            'latitude': centre_latitude,
+            'longitude': centre_longitude,
+        }))
+
+    columns = ['date', 'front', 'battles', 'latitude', 'longitude']
+    tracks = pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(columns=columns)
+    return battle_fronts, tracks
+
+
+def anchored_fronts(battles_df, **kwargs):
+    '''
+      The front ('North'/'East', see fronts.assign_front) of every battle: every front found by segment_fronts
+      (called with kwargs) belongs to the anchored front nearest to the mean of its daily centres.
+      Battles in no front found (isolated battles) get NaN
+      anchored_fronts(df_battles_only) --> Categorical(['East', nan, 'North', ...])
+    '''
+    battle_fronts, tracks = segment_fronts(battles_df, **kwargs)
+    centres = tracks.groupby('front')[['latitude', 'longitude']].mean()
+    names = fronts.assign_front(centres['latitude'], centres['longitude'])
+
+    codes = np.full(len(battles_df), -1, dtype=np.int8)
+    found = battle_fronts >= 0
+    codes[found] = names.codes[centres.index.get_indexer(battle_fronts[found])]
+    return pd.Categorical.from_codes(codes, categories=names.categories)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The modules of the app live at the root of the repository
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
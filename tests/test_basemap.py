@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import basemap
+
+DATA_DIR = Path(__file__).resolve().parent.parent.joinpath('Data')
+
+
+@pytest.fixture(scope='module')
+def ukraine_map():
+    return basemap.Basemap(DATA_DIR.joinpath('ukraine_geojson-master'))
+
+
+def test_points_outside_ukraine_get_no_oblast(ukraine_map):
+    # Warsaw, no coordinates, a point in the Black Sea
+    oblasts = ukraine_map.assign_oblast(np.array([52.23, np.nan, 44.5]), np.array([21.01, np.nan, 32.0]))
+
+    assert pd.isna(oblasts).all()
+
+
+def test_points_just_outside_a_region_get_the_nearest_one(ukraine_map):
+    names, geometries = ukraine_map.regions
+    # A vertex of every region, moved 0.01 degrees away from the region's centre
+    vertices = np.array([geometry.exterior.coords[0] if geometry.geom_type == 'Polygon'
+                         else max(geometry.geoms, key=lambda part: part.area).exterior.coords[0]
+                         for geometry in geometries])
+    centres = np.array([[geometry.centroid.x, geometry.centroid.y] for geometry in geometries])
+    direction = (vertices - centres) / np.linalg.norm(vertices - centres, axis=1)[:, None]
+    points = vertices + 0.01 * direction
+
+    oblasts = ukraine_map.assign_oblast(points[:, 1], points[:, 0])
+
+    assert not pd.isna(oblasts).any()
+
+
+def test_bundled_explosions_are_assigned(ukraine_map):
+    df = pd.read_csv(DATA_DIR.joinpath('civ_explosions.csv'), index_col=0)
+
+    oblasts = ukraine_map.assign_oblast(df['latitude'].to_numpy(), df['longitude'].to_numpy())
+
+    # Only events at sea (Snake Island, the Black Sea) stay outside every region
+    unassigned = df[pd.isna(oblasts)]
+    assert len(unassigned) < 0.01 * len(df)
+    assert (unassigned['latitude'] < 46.7).all()
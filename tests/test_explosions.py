@@ -0,0 +1,109 @@
+from pathlib import Path
+
+import geopy.distance
+import numpy as np
+import pandas as pd
+import pytest
+
+import explosions
+
+DATA_DIR = Path(__file__).resolve().parent.parent.joinpath('Data')
+
+
+def civilian_loop(df_explosions, df_battles_only):
+    # calculate_update_civ_explosions as the app first wrote it: a geodesic call per explosion and battle
+    civilian_explosion_ids = []
+    for _, explosion_row in df_explosions.iterrows():
+        explosion_loc = (explosion_row['latitude'], explosion_row['longitude'])
+        battle_explosion = False
+        start_date = explosion_row['event_date'] - pd.DateOffset(days=21)
+        end_date = explosion_row['event_date'] + pd.DateOffset(days=10)
+        df_battles_within_range = df_battles_only[(df_battles_only['event_date'] > start_date)
+                                                  & (df_battles_only['event_date'] < end_date)]
+        for _, battle_row in df_battles_within_range.iterrows():
+            battle_loc = (battle_row['latitude'], battle_row['longitude'])
+            if geopy.distance.geodesic(explosion_loc, battle_loc).km < 100:
+                battle_explosion = True
+                break
+        if not battle_explosion:
+            civilian_explosion_ids.append(explosion_row['data_id'])
+    return civilian_explosion_ids
+
+
+@pytest.fixture(scope='module')
+def df_explosions():
+    df = pd.read_csv(DATA_DIR.joinpath('civ_explosions.csv'), index_col=0)
+    df['event_date'] = pd.to_datetime(df['event_date'])
+    return df[['data_id', 'event_date', 'latitude', 'longitude']].reset_index(drop=True)
+
+
+def battles_around(df_explosions, seed=0):
+    # Battles next to every third explosion: just inside or just outside 100 km (on the ellipsoid),
+    # on days inside the window or on its (excluded) first and last days
+    rng = np.random.default_rng(seed)
+    rows = []
+    for explosion in df_explosions.iloc[::3].itertuples():
+        distance = rng.choice([99.9, 100.1, 60.0, 150.0])
+        offset = rng.choice([-21, -20, 0, 9, 10])
+        point = geopy.distance.geodesic(kilometers=distance).destination((explosion.latitude, explosion.longitude),
+                                                                           rng.uniform(0, 360))
+        rows.append({'event_date': explosion.event_date + pd.Timedelta(days=int(offset)),
+                     'latitude': point.latitude, 'longitude': point.longitude})
+    return pd.DataFrame(rows)
+
+
+def test_civilian_explosion_ids_match_the_loop(df_explosions):
+    df_battles_only = battles_around(df_explosions)
+
+    ids = explosions.find_civilian_explosion_ids(df_explosions, df_battles_only)
+
+    assert ids == civilian_loop(df_explosions, df_battles_only)
+    # Both sides of the radius and of the window occur, so the comparison covers the borders
+    assert 0 < len(ids) < len(df_explosions)
+
+
+@pytest.mark.parametrize('cutoff', ['2022-06-01', '2022-11-01', '2023-01-10'])
+def test_incremental_classification_matches_a_full_run(df_explosions, cutoff):
+    cutoff = pd.Timestamp(cutoff)
+    df_battles_only = battles_around(df_explosions)
+
+    # Classify the data up to the cutoff
+    before, state = explosions.classify_incremental(None, df_explosions[df_explosions['event_date'] < cutoff],
+                                                    df_battles_only[df_battles_only['event_date'] < cutoff])
+
+    # Battles after the cutoff in the look-ahead window of civilian explosions of the days before it
+    last_days = df_explosions[df_explosions['event_date'].between(cutoff - pd.Timedelta(days=9), cutoff,
+                                                                  inclusive='left')
+                              & df_explosions['data_id'].isin(before)]
+    assert len(last_days)
+    late_battles = pd.DataFrame({'event_date': cutoff,
+                                 'latitude': last_days['latitude'] + 0.1, 'longitude': last_days['longitude']})
+    df_battles_only = pd.concat([df_battles_only, late_battles], ignore_index=True)
+
+    # Append the later days
+    ids, _ = explosions.classify_incremental(state, df_explosions, df_battles_only)
+
+    assert ids == explosions.find_civilian_explosion_ids(df_explosions, df_battles_only)
+    assert not set(last_days['data_id']) & set(ids)
+
+
+def test_incremental_classification_with_removed_battles(df_explosions):
+    df_battles_only = battles_around(df_explosions)
+    _, state = explosions.classify_incremental(None, df_explosions, df_battles_only)
+
+    remaining = df_battles_only.iloc[::2]
+    ids, _ = explosions.classify_incremental(state, df_explosions, remaining)
+
+    assert ids == explosions.find_civilian_explosion_ids(df_explosions, remaining)
+
+
+@pytest.mark.parametrize('workers', [2, 3])
+def test_sharded_classification_matches_the_serial_one(df_explosions, monkeypatch, workers):
+    df_battles_only = battles_around(df_explosions)
+    serial = explosions.battle_nearby_mask(df_explosions, df_battles_only)
+
+    # Shard the bundled explosions despite their small number
+    monkeypatch.setattr(explosions, 'PARALLEL_MIN_EXPLOSIONS', 0)
+    sharded = explosions.battle_nearby_mask(df_explosions, df_battles_only, workers=workers)
+
+    np.testing.assert_array_equal(sharded, serial)
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+import fronts
+
+
+def battles(days):
+    # Battles of consecutive days, newest day first like the ACLED export
+    dates = pd.date_range('2022-03-01', periods=len(days))[::-1]
+    return pd.DataFrame([{'event_date': date, 'longitude': lon, 'latitude': lat}
+                         for date, points in zip(dates, days[::-1]) for lon, lat in points])
+
+
+def test_ordered_lines_follow_the_front():
+    # Battles from Kharkiv to Kherson, in shuffled order
+    points = [(36.9, 49.9), (37.6, 49.2), (38.0, 48.4), (37.7, 47.8), (36.8, 47.5), (35.5, 47.3), (34.3, 47.1),
+              (33.0, 46.8)]
+    rng = np.random.default_rng(0)
+    df = battles([[points[i] for i in rng.permutation(len(points))]])
+
+    line = fronts.DailyFronts(df).ordered_lines(end=fronts.EAST_ANCHORS[0])[0]
+
+    # The line finishes next to Odesa, the first anchor of the eastern polygon
+    assert shapely.is_simple(line)
+    np.testing.assert_allclose(shapely.get_coordinates(line), points)
+    assert shapely.is_valid(fronts.create_east_polygon(line))
+
+
+def test_ordered_lines_with_consecutive_single_location_days():
+    line_day = [(37.0, 48.0), (37.5, 48.3), (38.2, 47.6), (36.8, 47.2)]
+    single_location = [(38.0, 48.6)] * 3
+    daily = fronts.DailyFronts(battles([line_day, single_location, single_location]))
+
+    lines = daily.ordered_lines(end=fronts.EAST_ANCHORS[0])
+
+    assert len(lines) == 3
+    # Both single location days take the line of the first day
+    assert shapely.equals(lines[1], lines[0]) and shapely.equals(lines[2], lines[0])
+    assert shapely.get_num_coordinates(lines[0]) > 1
+
+
+def test_ordered_lines_wrap_around_to_the_last_line():
+    single_location = [(38.0, 48.6)] * 2
+    line_day = [(37.0, 48.0), (37.5, 48.3), (38.2, 47.6)]
+    lines = fronts.DailyFronts(battles([single_location, single_location, line_day])).ordered_lines()
+
+    assert all(shapely.equals(line, lines[2]) for line in lines[:2])
+
+
+def test_ordered_lines_without_any_line():
+    lines = fronts.DailyFronts(battles([[(38.0, 48.6)] * 3, [(37.0, 48.0)]])).ordered_lines()
+
+    assert list(shapely.get_num_coordinates(lines)) == [2, 2]
+
+
+def test_positions_match_the_ordered_lines():
+    df = battles([[(37.0, 48.0), (37.5, 48.3), (38.2, 47.6), (36.8, 47.2), (37.0, 48.0)]])
+    daily = fronts.DailyFronts(df)
+
+    positions = daily.positions(end=fronts.EAST_ANCHORS[0])
+    on_line = df.assign(position=positions).dropna().sort_values('position')
+
+    np.testing.assert_allclose(on_line[['longitude', 'latitude']].to_numpy(),
+                               shapely.get_coordinates(daily.ordered_lines(end=fronts.EAST_ANCHORS[0])[0]))
+
+
+def jittered_days(points, days, seed=0):
+    # Battles along the chain of points, moved a little every day
+    rng = np.random.default_rng(seed)
+    return [[(lon + rng.normal(0, 0.1), lat + rng.normal(0, 0.1)) for lon, lat in points] for _ in range(days)]
+
+
+@pytest.mark.parametrize('workers', [2, 3, 4])
+@pytest.mark.parametrize('equal_area', [False, True])
+def test_threaded_polygons_and_areas_match_the_serial_ones(monkeypatch, workers, equal_area):
+    east = fronts.DailyFronts(battles(jittered_days(
+        [(36.9, 49.9), (37.6, 49.2), (38.0, 48.4), (37.7, 47.8), (36.8, 47.5), (35.5, 47.3), (34.3, 47.1),
+         (33.0, 46.8)], 61)))
+    north = fronts.DailyFronts(battles(jittered_days([(30.6, 51.0), (31.5, 51.1), (32.5, 51.3), (33.5, 51.4)], 61,
+                                                     seed=1)))
+    lines_east = east.ordered_lines(end=fronts.EAST_ANCHORS[0])
+    lines_north = north.ordered_lines(end=fronts.NORTH_ANCHORS[0])
+    serial = [fronts.create_east_polygon(lines_east, equal_area=equal_area),
+              fronts.create_north_polygon(lines_north, equal_area=equal_area)]
+
+    # Split the few days into chunks despite their small number
+    monkeypatch.setattr(fronts, 'PARALLEL_MIN_DAYS', 1)
+    threaded = [fronts.create_east_polygon(lines_east, equal_area=equal_area, workers=workers),
+                fronts.create_north_polygon(lines_north, equal_area=equal_area, workers=workers)]
+
+    for serial_polygons, threaded_polygons in zip(serial, threaded):
+        assert len(threaded_polygons) == len(serial_polygons) == 61
+        assert shapely.equals_exact(threaded_polygons, serial_polygons, tolerance=0).all()
+        buffer = fronts.AREA_BUFFER_M if equal_area else 0.001
+        areas = fronts.area_differences(serial_polygons, buffer)
+        assert np.array_equal(fronts.area_differences(serial_polygons, buffer, workers=workers), areas)
+        assert np.array_equal(fronts.area_differences(threaded_polygons, buffer, workers=workers), areas)
+        assert (areas[1:] > 0).all()
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+import geodistance
+
+
+@pytest.mark.parametrize('radius_km', [5, 40, 300])
+def test_neighbour_pairs_match_the_distance_matrix(radius_km):
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(44.5, 52.3, 800)
+    lon = rng.uniform(22.1, 40.2, 800)
+
+    i, j = geodistance.neighbour_pairs(lat, lon, radius_km, chunk_size=100)
+
+    within = geodistance.within_mask(lat, lon, lat, lon, radius_km)
+    np.fill_diagonal(within, False)
+    assert sorted(zip(i.tolist(), j.tolist())) == list(zip(*np.nonzero(within)))
+
+
+def test_sphere_grid_neighbours_contain_the_close_points():
+    grid = geodistance.SphereGrid(50 / geodistance.EARTH_RADIUS_KM)
+    lat, lon = np.array([50.45, 50.7]), np.array([30.52, 30.6])
+
+    assert geodistance.haversine_km(lat[0], lon[0], lat[1], lon[1]) < 50
+    assert grid.cell_ids(lat[1:], lon[1:])[0] in grid.neighbour_ids(lat[:1], lon[:1])[0]
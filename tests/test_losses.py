@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import losses
+
+
+@pytest.fixture
+def df_cumulative():
+    # 2022-03-02 reported twice, 2022-03-03 missing, the tanks going down on 2022-03-05
+    return pd.DataFrame({
+        'date': pd.to_datetime(['2022-03-01', '2022-03-02', '2022-03-02', '2022-03-04', '2022-03-05', '2022-03-06']),
+        'day': np.array([6, 7, 7, 9, 10, 11], dtype=np.int16),
+        'tank': [10, 12, 15, 20, 16, 25],
+        'drone': [5, 6, 7, 9, 9, 12],
+        'source': ['a', 'b', 'c', 'd', 'e', 'f'],
+    })
+
+
+@pytest.fixture
+def df_correction():
+    # Two drones counted by a reclassification on 2022-03-04, three tanks taken out on 2022-03-05,
+    # a category the losses do not have
+    return pd.DataFrame({
+        'date': pd.to_datetime(['2022-03-04', '2022-03-05']),
+        'day': np.array([9, 10], dtype=np.int16),
+        'tank': [0, -3],
+        'drone': [2, 0],
+        'naval ship': [1, 0],
+    })
+
+
+def test_daywise_gives_one_row_per_calendar_day(df_cumulative):
+    df_by_day = losses.daywise(df_cumulative)
+
+    pd.testing.assert_series_equal(df_by_day['date'], pd.Series(pd.date_range('2022-03-01', '2022-03-06',
+                                                                               name='date')))
+    np.testing.assert_array_equal(df_by_day['day'], np.arange(6, 12, dtype=np.int16))
+    # The last report of a date is kept, the missing day has none
+    np.testing.assert_array_equal(df_by_day['tank'], np.array([10, 5, np.nan, 5, 0, 5], dtype=np.float32))
+    np.testing.assert_array_equal(df_by_day['drone'], np.array([5, 2, np.nan, 2, 0, 3], dtype=np.float32))
+    assert df_by_day['source'].tolist() == ['a', 'c', np.nan, 'd', 'e', 'f']
+    assert df_by_day['tank'].dtype == np.float32
+
+
+def test_daywise_takes_the_corrections_out_on_their_date(df_cumulative, df_correction):
+    df_by_day = losses.daywise(df_cumulative, corrections=df_correction)
+
+    # Corrected cumulative tanks 10, 15, -, 20, 19, 28: the decrease is held at 20
+    np.testing.assert_array_equal(df_by_day['tank'], np.array([10, 5, np.nan, 5, 0, 8], dtype=np.float32))
+    # Corrected cumulative drones 5, 7, -, 7, 7, 10
+    np.testing.assert_array_equal(df_by_day['drone'], np.array([5, 2, np.nan, 0, 0, 3], dtype=np.float32))
+    assert 'naval ship' not in df_by_day.columns
+
+
+def test_daywise_without_monotonic_keeps_the_decrease(df_cumulative, df_correction):
+    df_by_day = losses.daywise(df_cumulative, corrections=df_correction, monotonic=False)
+
+    np.testing.assert_array_equal(df_by_day['tank'], np.array([10, 5, np.nan, 5, -1, 9], dtype=np.float32))
+    np.testing.assert_array_equal(df_by_day['drone'], np.array([5, 2, np.nan, 0, 0, 3], dtype=np.float32))
+
+
+def test_tidy_has_a_row_per_reported_day_and_category(df_cumulative, df_correction):
+    df_by_day = losses.daywise(df_cumulative, corrections=df_correction)
+
+    df_tidy = losses.tidy(df_by_day)
+
+    reported = pd.to_datetime(['2022-03-01', '2022-03-02', '2022-03-04', '2022-03-05', '2022-03-06'])
+    assert df_tidy['date'].tolist() == list(reported) * 2
+    assert df_tidy['day'].tolist() == [6, 7, 9, 10, 11] * 2
+    assert df_tidy['category'].tolist() == ['tank'] * 5 + ['drone'] * 5
+    assert list(df_tidy['category'].cat.categories) == ['tank', 'drone']
+    np.testing.assert_array_equal(df_tidy['losses'], np.array([10, 5, 5, 0, 8, 5, 2, 0, 0, 3], dtype=np.float32))
+
+    # As DataFrame.melt gives it
+    melted = df_by_day.melt(id_vars=['date', 'day'], value_vars=['tank', 'drone'], var_name='category',
+                            value_name='losses').dropna(subset=['losses'])
+    np.testing.assert_array_equal(df_tidy['losses'], melted['losses'])
@@ -0,0 +1,122 @@
+import logging
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+import basemap
+import loaders
+import pipeline
+import segments
+
+DATA_DIR = Path(__file__).resolve().parent.parent.joinpath('Data')
+
+
+def test_artifacts_survive_the_parquet_copies(tmp_path, caplog):
+    shutil.copy(DATA_DIR.joinpath(pipeline.PERSONNEL_LOSSES), tmp_path)
+    pipeline.build(tmp_path, names=['personnel_by_day'], workers=1)
+    built = pipeline.read_artifact(tmp_path, 'personnel_by_day')
+    assert built is not None
+
+    # Writing the Parquet copies, then deleting them, does not change the inputs of the artifact
+    loaders.ingest(tmp_path)
+    pd.testing.assert_frame_equal(pipeline.read_artifact(tmp_path, 'personnel_by_day'), built)
+    shutil.rmtree(tmp_path.joinpath('parquet'))
+    pd.testing.assert_frame_equal(pipeline.read_artifact(tmp_path, 'personnel_by_day'), built)
+
+    # A modified CSV file does, the artifact is then computed inline with a warning
+    csv_path = tmp_path.joinpath(pipeline.PERSONNEL_LOSSES)
+    stat = csv_path.stat()
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert pipeline.read_artifact(tmp_path, 'personnel_by_day') is None
+    with caplog.at_level(logging.WARNING, logger='pipeline'):
+        pd.testing.assert_frame_equal(pipeline.load(tmp_path, 'personnel_by_day'), built)
+    assert 'personnel_by_day' in caplog.text
+
+
+def write_acled(data_path):
+    # The bundled explosions, every third one turned into a battle, as the ACLED export, and the map
+    df = pd.read_csv(DATA_DIR.joinpath('civ_explosions.csv'), index_col=0)
+    df.loc[df.index[::3], ['event_type', 'sub_event_type']] = ['Battles', 'Armed clash']
+    csv_path = data_path.joinpath(pipeline.BATTLE_DATA)
+    df.to_csv(csv_path, index=False)
+    data_path.joinpath(pipeline.MAP_DIR).symlink_to(DATA_DIR.joinpath(pipeline.MAP_DIR))
+    return csv_path
+
+
+def test_build_reads_the_battle_data_once(tmp_path, monkeypatch):
+    csv_path = write_acled(tmp_path)
+    shutil.copy(DATA_DIR.joinpath(pipeline.PERSONNEL_LOSSES), tmp_path)
+
+    # Moved away once read: a stage reading it again fails
+    load_battles = pipeline.load_battles
+
+    def load_once(data_path):
+        df_battle = load_battles(data_path)
+        csv_path.rename(tmp_path.joinpath('read.csv'))
+        return df_battle
+
+    # Likewise for the fronts, in the stage processes too
+    anchored_fronts = segments.anchored_fronts
+    calls = []
+
+    def anchor_once(battles_df):
+        calls.append(len(battles_df))
+        assert len(calls) == 1
+        return anchored_fronts(battles_df)
+
+    monkeypatch.setattr(pipeline, 'load_battles', load_once)
+    monkeypatch.setattr(segments, 'anchored_fronts', anchor_once)
+    names = ['civilian_explosions', 'front_segments', 'daily_front_movement', 'event_regions', 'personnel_by_day']
+    pipeline.build(tmp_path, names=names, workers=2)
+    tmp_path.joinpath('read.csv').rename(csv_path)
+
+    for name in names:
+        assert pipeline.read_artifact(tmp_path, name) is not None
+
+
+def test_event_regions_join_the_battle_data(tmp_path):
+    write_acled(tmp_path)
+    pipeline.build(tmp_path, names=['event_regions'], workers=1)
+
+    # The app joins the front and oblast of every event instead of computing them
+    df_battle = pipeline.load_battles(tmp_path)
+    assert 'front' not in df_battle.columns and 'oblast' not in df_battle.columns
+    joined = pipeline.join_event_regions(df_battle, pipeline.read_artifact(tmp_path, 'event_regions'))
+
+    ukraine_map = basemap.Basemap(DATA_DIR.joinpath(pipeline.MAP_DIR))
+    pd.testing.assert_series_equal(joined['front'], pipeline.with_fronts(df_battle)['front'])
+    pd.testing.assert_series_equal(joined['oblast'], pd.Series(ukraine_map.assign_oblast(
+        df_battle['latitude'], df_battle['longitude']), index=df_battle.index, name='oblast'))
+    assert set(joined['front'].dropna()) == {'North', 'East'}
+
+    # A copy of the map keeps the artifact, a changed map makes it stale
+    map_dir = tmp_path.joinpath(pipeline.MAP_DIR)
+    map_dir.unlink()
+    shutil.copytree(DATA_DIR.joinpath(pipeline.MAP_DIR), map_dir)
+    assert pipeline.read_artifact(tmp_path, 'event_regions') is not None
+    geojson = next(map_dir.glob('UA_*.geojson'))
+    stat = geojson.stat()
+    os.utime(geojson, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert pipeline.read_artifact(tmp_path, 'event_regions') is None
+
+
+def test_load_computes_from_the_battle_data_it_is_given(tmp_path, monkeypatch, caplog):
+    write_acled(tmp_path)
+
+    # The app from cold, without artifacts: the fronts are found once, for event_regions
+    df_battle = pipeline.load_battles(tmp_path)
+    with caplog.at_level(logging.WARNING, logger='pipeline'):
+        df_battle = pipeline.join_event_regions(df_battle, pipeline.load(tmp_path, 'event_regions', df_battle))
+
+    # The other artifacts use the joined battle data, neither reading it again nor finding the fronts
+    def fail(*args, **kwargs):
+        raise AssertionError('the battle data is read or its fronts found again')
+
+    monkeypatch.setattr(pipeline, 'load_battles', fail)
+    monkeypatch.setattr(segments, 'anchored_fronts', fail)
+    for name in ['civilian_explosions', 'daily_front_movement', 'monthly_front_movement', 'front_segments']:
+        with caplog.at_level(logging.WARNING, logger='pipeline'):
+            pipeline.load(tmp_path, name, df_battle)
+        assert name in caplog.text
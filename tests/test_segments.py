@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+import geodistance
+import segments
+
+
+def clustered_battles(centres, days, per_day, rng, spread=0.1):
+    # per_day battles around every (latitude, longitude) centre on every day
+    rows = []
+    for date in pd.date_range('2022-03-01', periods=days):
+        for latitude, longitude in centres:
+            rows += [{'event_date': date, 'latitude': lat, 'longitude': lon}
+                     for lat, lon in zip(rng.normal(latitude, spread, per_day), rng.normal(longitude, spread, per_day))]
+    return pd.DataFrame(rows)
+
+
+def test_dbscan_matches_the_distance_matrix():
+    rng = np.random.default_rng(0)
+    latitude = np.concatenate([rng.normal(48.5, 0.3, 150), rng.normal(46.7, 0.2, 100), rng.uniform(45, 52, 50)])
+    longitude = np.concatenate([rng.normal(37.8, 0.3, 150), rng.normal(32.8, 0.2, 100), rng.uniform(23, 40, 50)])
+
+    labels = segments.dbscan(latitude, longitude, eps_km=25, min_samples=4)
+
+    # Core points have min_samples points within eps (themselves included), clusters are the connected core points
+    within = geodistance.within_mask(latitude, longitude, latitude, longitude, 25)
+    core = within.sum(axis=1) >= 4
+    assert np.array_equal(labels >= 0, core | (within[:, core].any(axis=1)))
+    linked = within & core[:, None] & core[None, :]
+    for i in np.flatnonzero(core):
+        assert np.all(labels[linked[i]] == labels[i])
+    assert len(np.unique(labels[core])) == 2
+
+
+def test_fronts_keep_their_identity_over_time():
+    rng = np.random.default_rng(1)
+    battles_df = clustered_battles([(48.6, 37.9), (46.7, 32.8)], days=20, per_day=5, rng=rng)
+
+    battle_fronts, tracks = segments.segment_fronts(battles_df)
+
+    assert tracks['front'].nunique() == 2
+    donbas = battle_fronts[battles_df['longitude'].to_numpy() > 35]
+    kherson = battle_fronts[battles_df['longitude'].to_numpy() < 35]
+    assert len(np.unique(donbas)) == 1 and len(np.unique(kherson)) == 1 and donbas[0] != kherson[0]
+
+
+def test_anchored_fronts_keep_the_southern_battles():
+    rng = np.random.default_rng(2)
+    battles_df = clustered_battles([(50.9, 30.5), (48.6, 37.9), (46.7, 32.8)], days=10, per_day=5, rng=rng)
+    # An isolated battle far from every front
+    battles_df.loc[len(battles_df)] = [pd.Timestamp('2022-03-05'), 49.0, 24.0]
+
+    front = segments.anchored_fronts(battles_df)
+
+    latitude, longitude = battles_df['latitude'].to_numpy(), battles_df['longitude'].to_numpy()
+    assert (front[latitude > 50.3] == 'North').all()
+    assert (front[(latitude < 50.3) & (longitude > 25)] == 'East').all()
+    assert pd.isna(front[-1])